@@ -34,7 +34,7 @@ app.get('/', (req, res) => {
         message: '🎬 Movie Recommendation Backend API',
         version: '1.0.0',
         endpoints: {
-            '/api/recommend': 'GET - Get movie recommendations (param: title)',
+            '/api/recommend': 'GET - Get movie recommendations (params: title or tmdb_id, blend)',
             '/api/search': 'GET - Search for movies (param: query)',
             '/api/health': 'GET - Health check'
         }
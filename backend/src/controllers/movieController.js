@@ -12,20 +12,24 @@ class MovieController {
      */
     async getRecommendations(req, res) {
         try {
-            const { title } = req.query;
+            const { title, tmdb_id: tmdbId, blend, variant } = req.query;
+            const userId = req.get('X-User-Id');
 
             // Validation
-            if (!title || title.trim() === '') {
+            if ((!title || title.trim() === '') && !tmdbId) {
                 return res.status(400).json({
                     success: false,
-                    error: 'Please provide a movie title'
+                    error: 'Please provide a movie title or tmdb_id'
                 });
             }
 
             // Call ML service
-            const result = await mlService.getRecommendations(title);
+            const result = await mlService.getRecommendations(title, { blend, tmdbId, variant, userId });
 
             if (!result.success) {
+                if (result.retryAfter) {
+                    res.set('Retry-After', result.retryAfter);
+                }
                 return res.status(result.status || 500).json({
                     success: false,
                     error: result.error
@@ -64,6 +68,9 @@ class MovieController {
             const result = await mlService.searchMovies(query);
 
             if (!result.success) {
+                if (result.retryAfter) {
+                    res.set('Retry-After', result.retryAfter);
+                }
                 return res.status(result.status || 500).json({
                     success: false,
                     error: result.error
@@ -5,23 +5,85 @@
  */
 
 import axios from 'axios';
+import { decodeBody, decodeResponse, requestOptions } from '../utils/mlResponse.js';
+import snapshotService from './snapshotService.js';
 
 const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:5000';
+const ROUTING_CHECK_MS = 30000;
 
 class MLService {
+  constructor() {
+    // Until the ML service says otherwise, assume user ids pick the variant
+    this.weightedRouting = true;
+    this.routingCheckedAt = 0;
+  }
+
+  /**
+   * Whether the ML service splits users between variants (variants.json
+   * weights), rechecked via /api/health at most every 30 seconds. Without
+   * weights every user gets the default variant, which the snapshot serves.
+   */
+  async isWeightedRouting() {
+    const now = Date.now();
+    if (now - this.routingCheckedAt >= ROUTING_CHECK_MS) {
+      this.routingCheckedAt = now;
+      const health = await this.checkHealth();
+      if (health.success && typeof health.data.weighted_routing === 'boolean') {
+        this.weightedRouting = health.data.weighted_routing;
+      }
+    }
+    return this.weightedRouting;
+  }
+
   /**
    * Get movie recommendations
+   *
+   * @param {string} movieTitle
+   * @param {object} options - `blend` (0-1) weights the ratings-based signal,
+   *   `tmdbId` looks the movie up by id instead of by title, `variant` or
+   *   `userId` select the model variant for A/B tests
    */
-  async getRecommendations(movieTitle) {
+  async getRecommendations(movieTitle, options = {}) {
+    const query = { title: movieTitle, tmdbId: options.tmdbId };
+
+    // Content-only requests for known movies are answered from the snapshot
+    // (default variant); misses, blend and A/B-routed requests go to the ML service
+    const routed = Boolean(options.variant) ||
+      Boolean(options.userId && await this.isWeightedRouting());
+    if (!Number(options.blend) && !routed) {
+      const cached = snapshotService.getRecommendations(query);
+      if (cached) {
+        return { success: true, data: cached };
+      }
+    }
+
     try {
+      const params = {};
+      if (movieTitle) {
+        params.title = movieTitle;
+      }
+      if (options.tmdbId !== undefined) {
+        params.tmdb_id = options.tmdbId;
+      }
+      if (options.blend !== undefined) {
+        params.blend = options.blend;
+      }
+      if (options.variant) {
+        params.variant = options.variant;
+      }
+
+      const request = requestOptions(10000); // 10 second timeout
+      if (options.userId) {
+        request.headers['X-User-Id'] = options.userId;
+      }
       const response = await axios.get(`${ML_SERVICE_URL}/api/recommend`, {
-        params: { title: movieTitle },
-        timeout: 10000 // 10 second timeout
+        ...request,
+        params
       });
       
       return {
         success: true,
-        data: response.data
+        data: decodeResponse(response, 'recommendations')
       };
     } catch (error) {
       console.error('ML Service Error:', error.message);
@@ -29,13 +91,28 @@ class MLService {
       if (error.response) {
         // The request was made and the server responded with a status code
         // that falls out of the range of 2xx
+        const { status } = error.response;
+        if (status === 429 || status === 503) {
+          // Shed by the ML service's admission control
+          const cached = snapshotService.getRecommendations(query);
+          if (cached) {
+            return { success: true, data: { ...cached, degraded: true } };
+          }
+        }
+        const body = decodeBody(error.response.data, error.response.headers['content-type']) || {};
         return {
           success: false,
-          error: error.response.data.error || 'Failed to get recommendations',
-          status: error.response.status
+          error: body.error || 'Failed to get recommendations',
+          status,
+          retryAfter: error.response.headers['retry-after']
         };
       } else if (error.request) {
-        // The request was made but no response was received
+        // The request was made but no response was received: serve
+        // content-only results from the snapshot if it has this movie
+        const cached = snapshotService.getRecommendations(query);
+        if (cached) {
+          return { success: true, data: { ...cached, degraded: true } };
+        }
         return {
           success: false,
           error: 'ML service is not responding. Please ensure Flask server is running.',
@@ -58,22 +135,24 @@ class MLService {
   async searchMovies(query) {
     try {
       const response = await axios.get(`${ML_SERVICE_URL}/api/search`, {
-        params: { query },
-        timeout: 5000
+        ...requestOptions(5000),
+        params: { query }
       });
       
       return {
         success: true,
-        data: response.data
+        data: decodeResponse(response, 'matches')
       };
     } catch (error) {
       console.error('ML Service Search Error:', error.message);
       
       if (error.response) {
+        const body = decodeBody(error.response.data, error.response.headers['content-type']) || {};
         return {
           success: false,
-          error: error.response.data.error || 'Search failed',
-          status: error.response.status
+          error: body.error || 'Search failed',
+          status: error.response.status,
+          retryAfter: error.response.headers['retry-after']
         };
       } else {
         return {
@@ -0,0 +1,213 @@
+/**
+ * Recommendation Snapshot
+ *
+ * Serves content-based recommendations from the read-only snapshot the ML
+ * training pipeline exports (models/serving/snapshot.bin), so the common
+ * request needs no call to the Flask service. The file is read once into
+ * memory and its sections are used in place as typed arrays.
+ */
+
+import fs from 'fs';
+import { fileURLToPath } from 'url';
+
+const SNAPSHOT_PATH = process.env.ML_SNAPSHOT_PATH ||
+  fileURLToPath(new URL('../../../ml-service/models/serving/snapshot.bin', import.meta.url));
+
+const MAGIC = 'MOVSNAP1';
+const RELOAD_CHECK_MS = 30000;
+
+const TMDB_IMG_BASE = 'https://image.tmdb.org/t/p/w500';
+const WIKI_BASE = 'https://en.wikipedia.org/wiki/';
+
+const TYPED_ARRAYS = {
+  u1: Uint8Array,
+  i4: Int32Array,
+  u4: Uint32Array,
+  f4: Float32Array,
+  f8: Float64Array
+};
+
+/**
+ * Same normalization as the ML service's title index. Titles where the
+ * two disagree (rare casefold differences) simply miss and go to Flask.
+ */
+export function normalizeTitle(title) {
+  return String(title)
+    .normalize('NFKD')
+    .replace(/\p{M}/gu, '')
+    .toLowerCase()
+    .replace(/[^\p{L}\p{N}]+/gu, ' ')
+    .trim();
+}
+
+function parseSnapshot(buffer) {
+  if (buffer.toString('latin1', 0, MAGIC.length) !== MAGIC) {
+    throw new Error('not a recommendation snapshot');
+  }
+  const headerSize = buffer.readUInt32LE(MAGIC.length);
+  const start = MAGIC.length + 4;
+  const header = JSON.parse(buffer.toString('utf8', start, start + headerSize));
+
+  // Typed array views need an aligned base; small reads can come from a shared pool
+  const data = buffer.byteOffset % 8 === 0 ? buffer : Buffer.from(buffer);
+  const sections = {};
+  for (const [name, { offset, dtype, length }] of Object.entries(header.sections)) {
+    sections[name] = new TYPED_ARRAYS[dtype](data.buffer, data.byteOffset + offset, length);
+  }
+  return { header, sections, buffer: data };
+}
+
+class SnapshotService {
+  constructor(path = SNAPSHOT_PATH) {
+    this.path = path;
+    this.snapshot = null;
+    this.mtimeMs = 0;
+    this.lastCheck = 0;
+  }
+
+  /**
+   * Load the snapshot, or reload it if training replaced the file
+   */
+  refresh() {
+    const now = Date.now();
+    if (this.lastCheck && now - this.lastCheck < RELOAD_CHECK_MS) {
+      return this.snapshot;
+    }
+    this.lastCheck = now;
+
+    try {
+      const { mtimeMs } = fs.statSync(this.path);
+      if (mtimeMs !== this.mtimeMs) {
+        this.snapshot = parseSnapshot(fs.readFileSync(this.path));
+        this.mtimeMs = mtimeMs;
+        console.log(`📦 Loaded recommendation snapshot (${this.snapshot.header.n_movies} movies)`);
+      }
+    } catch (error) {
+      if (error.code !== 'ENOENT') {
+        console.error('Snapshot Error:', error.message);
+      }
+      this.snapshot = null;
+      this.mtimeMs = 0;
+    }
+    return this.snapshot;
+  }
+
+  isAvailable() {
+    return this.refresh() !== null;
+  }
+
+  string(name, row) {
+    const { header, sections, buffer } = this.snapshot;
+    const offsets = sections[`${name}_offsets`];
+    const base = header.sections[`${name}_bytes`].offset;
+    return buffer.toString('utf8', base + offsets[row], base + offsets[row + 1]);
+  }
+
+  /**
+   * Row for a title (first movie with that normalized title), or -1
+   */
+  findTitle(title) {
+    const { key_offsets: offsets, key_bytes: bytes, key_rows: rows } = this.snapshot.sections;
+    const key = Buffer.from(normalizeTitle(title), 'utf8');
+    const keyBytes = Buffer.from(bytes.buffer, bytes.byteOffset, bytes.length);
+
+    // Leftmost binary search over the sorted UTF-8 keys
+    let lo = 0;
+    let hi = rows.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >>> 1;
+      const candidate = keyBytes.subarray(offsets[mid], offsets[mid + 1]);
+      if (Buffer.compare(candidate, key) < 0) {
+        lo = mid + 1;
+      } else {
+        hi = mid;
+      }
+    }
+    if (lo < rows.length && keyBytes.subarray(offsets[lo], offsets[lo + 1]).equals(key)) {
+      return rows[lo];
+    }
+    return -1;
+  }
+
+  /**
+   * Row for a TMDB id, or -1
+   */
+  findId(tmdbId) {
+    const { id_sorted: ids, id_rows: rows } = this.snapshot.sections;
+    let lo = 0;
+    let hi = ids.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >>> 1;
+      if (ids[mid] < tmdbId) {
+        lo = mid + 1;
+      } else {
+        hi = mid;
+      }
+    }
+    return lo < ids.length && ids[lo] === tmdbId ? rows[lo] : -1;
+  }
+
+  movie(row, distance) {
+    const { ids, vote_average: votes } = this.snapshot.sections;
+    const title = this.string('title', row);
+    const posterPath = this.string('poster', row);
+    const result = {
+      title,
+      tmdb_id: ids[row],
+      poster_url: posterPath ? TMDB_IMG_BASE + posterPath : null,
+      wiki_url: `${WIKI_BASE}${title.replaceAll(' ', '_')}_(film)`,
+      vote_average: Number.isNaN(votes[row]) ? null : votes[row]
+    };
+    if (distance !== undefined) {
+      result.distance = distance;
+    }
+    return result;
+  }
+
+  /**
+   * Recommendations in the ML service's /api/recommend shape, or null on a miss
+   *
+   * @param {object} query - `title` and/or `tmdbId`, `n` results
+   */
+  getRecommendations({ title, tmdbId, n = 5 }) {
+    if (!this.isAvailable()) {
+      return null;
+    }
+
+    let row = -1;
+    if (tmdbId !== undefined && tmdbId !== null && tmdbId !== '') {
+      const id = Number(tmdbId);
+      row = Number.isInteger(id) ? this.findId(id) : -1;
+    } else if (title) {
+      row = this.findTitle(title);
+    }
+    if (row < 0) {
+      return null;
+    }
+
+    const { header, sections } = this.snapshot;
+    const k = header.n_neighbors;
+    const count = Math.min(n, k);
+    const recommendations = [];
+    for (let j = 0; j < count; j++) {
+      const neighbor = sections.neighbors[row * k + j];
+      if (neighbor < 0) {
+        // Padding left after collapsing near-duplicates
+        break;
+      }
+      recommendations.push(this.movie(neighbor, sections.distances[row * k + j]));
+    }
+
+    return {
+      input: title || String(tmdbId),
+      matched: this.string('title', row),
+      tmdb_id: sections.ids[row],
+      blend: 0,
+      recommendations,
+      total: recommendations.length,
+      source: 'snapshot'
+    };
+  }
+}
+
+export default new SnapshotService();
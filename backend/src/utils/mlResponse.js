@@ -0,0 +1,117 @@
+/**
+ * ML Service Response Decoding
+ *
+ * The ML service can answer in row JSON, columnar JSON (URL prefixes sent
+ * once) or MessagePack. These helpers build the Accept header and turn any
+ * of them back into the row shape the controllers and frontend expect.
+ */
+
+export const COLUMNAR_MIMETYPE = 'application/vnd.movies.columnar+json';
+export const MSGPACK_MIMETYPE = 'application/x-msgpack';
+
+// ML_SERVICE_FORMAT=msgpack needs the optional '@msgpack/msgpack' package
+const PREFERRED_FORMAT = process.env.ML_SERVICE_FORMAT || 'columnar';
+
+let msgpackDecode = null;
+if (PREFERRED_FORMAT === 'msgpack') {
+  try {
+    ({ decode: msgpackDecode } = await import('@msgpack/msgpack'));
+  } catch (error) {
+    console.warn('ML_SERVICE_FORMAT=msgpack but @msgpack/msgpack is not installed, using columnar JSON');
+  }
+}
+
+/**
+ * Accept header for requests to the ML service
+ */
+export function acceptHeader() {
+  const types = [`${COLUMNAR_MIMETYPE};q=0.9`, 'application/json;q=0.8'];
+  if (msgpackDecode) {
+    types.unshift(MSGPACK_MIMETYPE);
+  }
+  return types.join(', ');
+}
+
+// Time reserved for the network round trip when telling the ML service
+// how long it has left
+const DEADLINE_MARGIN_MS = 250;
+
+/**
+ * Axios request options matching acceptHeader(), with the client timeout
+ * passed on as X-Deadline-Ms so the ML service can drop work that would
+ * finish after we stopped waiting
+ */
+export function requestOptions(timeout) {
+  return {
+    headers: {
+      Accept: acceptHeader(),
+      'X-Deadline-Ms': String(Math.max(timeout - DEADLINE_MARGIN_MS, 0))
+    },
+    // Binary bodies must not be parsed as text
+    responseType: msgpackDecode ? 'arraybuffer' : 'json',
+    timeout
+  };
+}
+
+/**
+ * Expand a columnar payload ({ column: [values] } plus prefixes) into rows
+ */
+export function expandColumnar(payload, rowsKey) {
+  const columns = payload[rowsKey];
+  if (!columns || Array.isArray(columns)) {
+    return payload;
+  }
+
+  const prefixes = payload.prefixes || {};
+  const keys = Object.keys(columns);
+  const length = keys.length ? columns[keys[0]].length : 0;
+
+  const rows = [];
+  for (let i = 0; i < length; i++) {
+    const row = {};
+    for (const key of keys) {
+      const value = columns[key][i];
+      row[key] = prefixes[key] && typeof value === 'string' ? prefixes[key] + value : value;
+    }
+    rows.push(row);
+  }
+
+  const { prefixes: _prefixes, format: _format, ...rest } = payload;
+  return { ...rest, [rowsKey]: rows };
+}
+
+function parseText(text) {
+  try {
+    return JSON.parse(text);
+  } catch (error) {
+    // Non-JSON bodies (e.g. proxy error pages) surface as the error message
+    return { error: text };
+  }
+}
+
+/**
+ * Decode an axios response body (JSON object, JSON text or MessagePack)
+ */
+export function decodeBody(data, contentType = '') {
+  if (data === undefined || data === null) {
+    return data;
+  }
+  if (contentType.includes(MSGPACK_MIMETYPE) && msgpackDecode) {
+    return msgpackDecode(new Uint8Array(data));
+  }
+  if (data instanceof ArrayBuffer || ArrayBuffer.isView(data)) {
+    return parseText(Buffer.from(data).toString('utf8'));
+  }
+  if (typeof data === 'string') {
+    return parseText(data);
+  }
+  return data;
+}
+
+/**
+ * Decode a successful response into the row shape
+ */
+export function decodeResponse(response, rowsKey) {
+  const payload = decodeBody(response.data, response.headers['content-type']);
+  return expandColumnar(payload, rowsKey);
+}
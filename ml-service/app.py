@@ -4,12 +4,22 @@ Flask API for Movie Recommendation System
 This API serves the trained ML model for movie recommendations.
 """
 
-from flask import Flask, request, jsonify
+import time
+_START = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import joblib
-import pandas as pd
-import difflib
 import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from serving import current_rss_mb, heavy_modules_loaded
+from variants import VariantRegistry
+from encoding import available_formats, encode, negotiate
+from admission import DEADLINE_HEADER, AdmissionController, Overloaded, check_deadline, parse_deadline
+
+_IMPORT_SECONDS = time.perf_counter() - _START
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -18,30 +28,120 @@ CORS(app)
 # === Load Model Artifacts ===
 MODELS_DIR = "models"
 
+# 'lean' serves the NumPy-only export, 'full' the joblib artifacts,
+# 'auto' picks lean whenever the training run exported it
+SERVING_MODE = os.environ.get("ML_SERVING_MODE", "auto")
+
 print("🚀 Loading ML models...")
-vectorizer = joblib.load(f"{MODELS_DIR}/vectorizer.joblib")
-svd = joblib.load(f"{MODELS_DIR}/svd.joblib")
-X_reduced = joblib.load(f"{MODELS_DIR}/X_reduced.joblib")
-knn = joblib.load(f"{MODELS_DIR}/knn.joblib")
-meta = joblib.load(f"{MODELS_DIR}/meta.joblib")
-titles = joblib.load(f"{MODELS_DIR}/titles.joblib")
-title_to_index = {t: i for i, t in enumerate(titles)}
-print("✅ Models loaded successfully!\n")
+_load_start = time.perf_counter()
+# models/ is the default variant, trained subdirectories are A/B variants
+variants = VariantRegistry.load(MODELS_DIR, mode=SERVING_MODE)
+model = variants[variants.default]
+STARTUP_STATS = {
+    "mode": model.mode,
+    "variants": variants.names,
+    "import_seconds": round(_IMPORT_SECONDS, 3),
+    "load_seconds": round(time.perf_counter() - _load_start, 3),
+    "rss_mb": current_rss_mb(),
+    "heavy_modules": heavy_modules_loaded(),
+}
+print(f"✅ Models loaded successfully! ({model.mode} mode, variants: {', '.join(variants.names)})")
+print(f"   Imports: {STARTUP_STATS['import_seconds']:.2f}s, "
+      f"load: {STARTUP_STATS['load_seconds']:.2f}s, "
+      f"RSS: {STARTUP_STATS['rss_mb'] or 0:.0f} MB, "
+      f"heavy modules: {', '.join(STARTUP_STATS['heavy_modules']) or 'none'}\n")
 
 TMDB_IMG_BASE = "https://image.tmdb.org/t/p/w500"
+WIKI_BASE = "https://en.wikipedia.org/wiki/"
+
+# Sent once per response in the columnar/binary formats instead of per row
+URL_PREFIXES = {
+    "poster_url": TMDB_IMG_BASE,
+    "wiki_url": WIKI_BASE
+}
+
+# Fuzzy matching and free-text queries run behind a bounded gate; past it,
+# requests are shed with 429/503 instead of queueing without limit
+MAX_CONCURRENT = int(os.environ.get("ML_MAX_CONCURRENT", os.cpu_count() or 4))
+MAX_QUEUE = int(os.environ.get("ML_MAX_QUEUE", 2 * MAX_CONCURRENT))
+expensive = AdmissionController("expensive", max_concurrent=MAX_CONCURRENT, max_queue=MAX_QUEUE)
+
+_metrics_lock = threading.Lock()
+METRICS = {"requests": 0, "shed": {}, "degraded": {}}
 
 
 # === Helper Functions ===
 def find_closest_title(query):
     """Find the closest matching title using fuzzy matching."""
-    matches = difflib.get_close_matches(query, titles, n=5, cutoff=0.4)
+    with expensive.admit(g.get("deadline")):
+        matches = g.model.fuzzy_titles(query, n=5, cutoff=0.4)
     return matches
 
 
 def get_wikipedia_url(title):
     """Generate a Wikipedia URL for a movie title."""
     formatted_title = title.replace(" ", "_")
-    return f"https://en.wikipedia.org/wiki/{formatted_title}_(film)"
+    return f"{WIKI_BASE}{formatted_title}_(film)"
+
+
+def respond(payload, rows_key=None):
+    """
+    Encode a result payload in the format the client asked for: row JSON
+    (default), columnar JSON or MessagePack (?format= or Accept header).
+    """
+    fmt = negotiate(request.accept_mimetypes, request.args.get("format"))
+    if fmt is None:
+        return jsonify({
+            "error": "Unsupported format",
+            "formats": available_formats()
+        }), 406
+    
+    body, mimetype = encode(payload, fmt, rows_key=rows_key, prefixes=URL_PREFIXES)
+    response = Response(body, mimetype=mimetype)
+    response.vary.add("Accept")
+    return response
+
+
+def movie_result(row, distance=None):
+    """Build the API representation of one movie row."""
+    movie = g.model.movie(row)
+    result = {
+        "title": movie["title"],
+        "tmdb_id": movie["tmdb_id"],
+        "poster_url": (
+            TMDB_IMG_BASE + movie["poster_path"]
+            if movie["poster_path"]
+            else None
+        ),
+        "wiki_url": get_wikipedia_url(movie["title"]),
+        "vote_average": movie["vote_average"]
+    }
+    if distance is not None:
+        result["distance"] = float(distance)
+    return result
+
+
+# === Admission Control ===
+
+@app.before_request
+def start_request():
+    """Record the client's deadline and drop requests that already missed it."""
+    with _metrics_lock:
+        METRICS["requests"] += 1
+    g.deadline = parse_deadline(request.headers.get(DEADLINE_HEADER))
+    if request.endpoint not in ("health", "metrics"):
+        check_deadline(g.deadline)
+    
+    # A/B routing: an explicit ?variant=, else a stable bucket of the user id
+    user_id = request.headers.get("X-User-Id") or request.args.get("user_id")
+    try:
+        g.variant = variants.choose(request.args.get("variant"), user_id)
+    except KeyError:
+        return jsonify({
+            "error": f"Unknown variant '{request.args.get('variant')}'",
+            "variants": variants.names
+        }), 400
+    g.model = variants[g.variant]
 
 
 # === API Routes ===
@@ -53,11 +153,15 @@ def home():
         "message": "🎬 Movie Recommendation API is running!",
         "version": "1.0",
         "endpoints": {
-            "/api/recommend": "GET - Get movie recommendations (param: title)",
+            "/api/recommend": "GET - Get movie recommendations (params: title or tmdb_id, blend, variant)",
+            "/api/recommend/text": "GET - Recommendations for a free-text description (param: query)",
             "/api/search": "GET - Search for movies (param: query)",
-            "/api/health": "GET - Health check"
+            "/api/health": "GET - Health check",
+            "/api/metrics": "GET - Request and load-shedding counters"
         },
-        "total_movies": len(titles)
+        "formats": available_formats(),
+        "variants": variants.names,
+        "total_movies": len(model)
     })
 
 
@@ -67,7 +171,10 @@ def health():
     return jsonify({
         "status": "healthy",
         "models_loaded": True,
-        "total_movies": len(titles)
+        "total_movies": len(model),
+        "startup": STARTUP_STATS,
+        "weighted_routing": variants.weighted,
+        "variants": variants.memory_report()
     })
 
 
@@ -82,99 +189,152 @@ def search():
     if len(query) < 2:
         return jsonify({"error": "Query must be at least 2 characters"}), 400
     
-    # Find matches
-    matches = find_closest_title(query)
+    # Prefix matches on the normalized title index first, then fuzzy matches
+    rows = g.model.prefix(query, limit=10)
+    if len(rows) < 10:
+        try:
+            for title in find_closest_title(query):
+                row = g.model.find(title)
+                if row not in rows:
+                    rows.append(row)
+        except Overloaded as error:
+            # Prefix matches are cheap; answer with those instead of shedding
+            if not rows:
+                raise
+            with _metrics_lock:
+                METRICS["degraded"][error.reason] = METRICS["degraded"].get(error.reason, 0) + 1
     
-    if not matches:
-        return jsonify({
+    if not rows:
+        return respond({
             "query": query,
             "matches": [],
             "message": "No matches found"
-        })
+        }, rows_key="matches")
     
     # Get metadata for matches
-    results = []
-    for title in matches[:10]:
-        idx = title_to_index[title]
-        row = meta.iloc[idx]
-        results.append({
-            "title": title,
-            "tmdb_id": int(row["id"]) if "id" in row else None,
-            "poster_url": (
-                TMDB_IMG_BASE + str(row["poster_path"])
-                if "poster_path" in row and pd.notnull(row["poster_path"])
-                else None
-            ),
-            "wiki_url": get_wikipedia_url(title),
-            "vote_average": float(row["vote_average"]) if "vote_average" in row else None
-        })
+    results = [movie_result(row) for row in rows[:10]]
     
-    return jsonify({
+    return respond({
         "query": query,
+        "variant": g.variant,
         "matches": results,
         "total": len(results)
-    })
+    }, rows_key="matches")
 
 
 @app.route("/api/recommend")
 def recommend():
     """Get movie recommendations."""
     movie_name = request.args.get("title", "").strip()
+    tmdb_id = request.args.get("tmdb_id", "").strip()
     
-    if not movie_name:
-        return jsonify({"error": "Please provide a 'title' parameter"}), 400
+    if not movie_name and not tmdb_id:
+        return jsonify({"error": "Please provide a 'title' or 'tmdb_id' parameter"}), 400
     
-    # Try exact match first
-    idx = title_to_index.get(movie_name)
-    matched_title = movie_name
+    # Weight of the collaborative (ratings) signal, 0 = content only
+    try:
+        blend = float(request.args.get("blend", 0))
+    except ValueError:
+        return jsonify({"error": "'blend' must be a number between 0 and 1"}), 400
+    if not 0 <= blend <= 1:
+        return jsonify({"error": "'blend' must be a number between 0 and 1"}), 400
+    if g.model.item_similarity is None:
+        blend = 0.0
+    
+    if tmdb_id:
+        # Callers that already know the TMDB id skip string matching entirely
+        if not (tmdb_id.isascii() and tmdb_id.isdigit()):
+            return jsonify({"error": "'tmdb_id' must be a positive integer"}), 400
+        idx = g.model.find_by_id(int(tmdb_id))
+        if idx is None:
+            return jsonify({"error": f"Movie with tmdb_id {tmdb_id} not found"}), 404
+        movie_name = movie_name or tmdb_id
+    else:
+        # Try exact (case/accent/punctuation-insensitive) match first
+        idx = g.model.find(movie_name)
+    
+    matched_title = g.model.title(idx) if idx is not None else movie_name
     
     # If no exact match, try fuzzy matching
     if idx is None:
         matches = find_closest_title(movie_name)
         if matches:
             matched_title = matches[0]
-            idx = title_to_index[matched_title]
+            idx = g.model.find(matched_title)
         else:
             return jsonify({
                 "error": f"Movie '{movie_name}' not found",
                 "suggestion": "Try the /api/search endpoint to find similar titles"
             }), 404
     
-    # Get recommendations using KNN
-    distances, indices = knn.kneighbors([X_reduced[idx]], n_neighbors=6)
-    
-    recommendations = []
-    for i in indices[0]:
-        if i == idx:
-            continue
-        
-        row = meta.iloc[i]
-        recommendations.append({
-            "title": row["title"],
-            "tmdb_id": int(row["id"]) if "id" in row else None,
-            "poster_url": (
-                TMDB_IMG_BASE + str(row["poster_path"])
-                if "poster_path" in row and pd.notnull(row["poster_path"])
-                else None
-            ),
-            "wiki_url": get_wikipedia_url(row["title"]),
-            "vote_average": float(row["vote_average"]) if "vote_average" in row else None,
-            "distance": float(distances[0][list(indices[0]).index(i)])
-        })
-        
-        if len(recommendations) >= 5:
-            break
+    neighbors = g.model.blended_neighbors(idx, n=5, weight=blend)
+    recommendations = [movie_result(i, d) for i, d in neighbors]
     
-    return jsonify({
+    return respond({
         "input": movie_name,
         "matched": matched_title,
+        "tmdb_id": g.model.movie(idx)["tmdb_id"],
+        "variant": g.variant,
+        "blend": blend,
+        "recommendations": recommendations,
+        "total": len(recommendations)
+    }, rows_key="recommendations")
+
+
+@app.route("/api/recommend/text")
+def recommend_text():
+    """Get recommendations for a free-text description."""
+    query = request.args.get("query", "").strip()
+    
+    if not query:
+        return jsonify({"error": "Please provide a 'query' parameter"}), 400
+    
+    with expensive.admit(g.deadline):
+        try:
+            vector = g.model.embed_text(query)
+        except (RuntimeError, OSError):
+            return jsonify({"error": "Free-text queries are not available for this model"}), 501
+        neighbors = g.model.nearest_to_vector(vector, n=5)
+    
+    recommendations = [movie_result(i, d) for i, d in neighbors]
+    
+    return respond({
+        "input": query,
+        "variant": g.variant,
         "recommendations": recommendations,
         "total": len(recommendations)
+    }, rows_key="recommendations")
+
+
+@app.route("/api/metrics")
+def metrics():
+    """Request, admission and load-shedding counters."""
+    with _metrics_lock:
+        counters = {
+            "requests": METRICS["requests"],
+            "shed": dict(METRICS["shed"]),
+            "degraded": dict(METRICS["degraded"])
+        }
+    return jsonify({
+        **counters,
+        "admission": {expensive.name: expensive.stats()}
     })
 
 
 # === Error Handlers ===
 
+@app.errorhandler(Overloaded)
+def overloaded(error):
+    with _metrics_lock:
+        METRICS["shed"][error.reason] = METRICS["shed"].get(error.reason, 0) + 1
+    response = jsonify({
+        "error": "Service is overloaded, please retry later",
+        "reason": error.reason
+    })
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, error.status
+
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Endpoint not found"}), 404
@@ -191,7 +351,7 @@ if __name__ == "__main__":
     print("=" * 60)
     print("🎬 Movie Recommendation API Server")
     print("=" * 60)
-    print(f"📊 Total movies in database: {len(titles)}")
+    print(f"📊 Total movies in database: {len(model)}")
     print("🌐 Starting server on http://0.0.0.0:5000")
     print("=" * 60)
     print()
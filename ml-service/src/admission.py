@@ -0,0 +1,139 @@
+"""
+Admission Control Module for Movie Recommendation System
+
+Caps how many expensive operations (fuzzy title matching, free-text
+queries) run at once, with a bounded wait queue in front of them. Work
+is shed before it starts when the queue is full or when the caller's
+deadline cannot be met, so the service does not spend CPU on answers the
+client has already given up on.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+
+DEADLINE_HEADER = 'X-Deadline-Ms'
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; carries the HTTP status and Retry-After."""
+
+    def __init__(self, reason, status, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_deadline(value, now=None):
+    """
+    Turn a relative budget in milliseconds (the X-Deadline-Ms header) into
+    an absolute time.monotonic() deadline. Missing or invalid values mean
+    no deadline.
+    """
+    if value is None or value == '':
+        return None
+    try:
+        budget_ms = float(value)
+    except ValueError:
+        return None
+    if math.isnan(budget_ms):
+        return None
+    return (time.monotonic() if now is None else now) + budget_ms / 1000
+
+
+def check_deadline(deadline):
+    """Shed a request whose deadline has already passed."""
+    if deadline is not None and time.monotonic() >= deadline:
+        raise Overloaded('deadline_expired', 503, 1)
+
+
+class AdmissionController:
+    """
+    Bounded concurrency gate for one class of expensive work.
+
+    At most `max_concurrent` callers run at a time and at most `max_queue`
+    wait. An EWMA of run time estimates how long a new caller would take
+    to finish, which decides whether its deadline is still reachable.
+    """
+
+    def __init__(self, name, max_concurrent=4, max_queue=8, max_wait=5.0, alpha=0.2):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.alpha = alpha
+
+        self._cond = threading.Condition()
+        self._running = 0
+        self._waiting = 0
+        self._ewma = None
+        self.admitted = 0
+        self.completed = 0
+        self.shed = {'queue_full': 0, 'deadline': 0, 'timeout': 0}
+
+    def _estimate(self):
+        """Expected seconds until a newly queued caller finishes."""
+        if self._ewma is None:
+            return 0.0
+        ahead = max(0, self._running + self._waiting + 1 - self.max_concurrent)
+        return self._ewma * (1 + ahead / self.max_concurrent)
+
+    def _retry_after(self):
+        return max(1, math.ceil(self._estimate()))
+
+    def _reject(self, reason, status):
+        self.shed[reason] += 1
+        return Overloaded(reason, status, self._retry_after())
+
+    @contextmanager
+    def admit(self, deadline=None):
+        """Run the body under the gate, or raise Overloaded without running it."""
+        with self._cond:
+            if deadline is not None and time.monotonic() + self._estimate() > deadline:
+                raise self._reject('deadline', 503)
+            if self._running >= self.max_concurrent and self._waiting >= self.max_queue:
+                raise self._reject('queue_full', 429)
+
+            self._waiting += 1
+            try:
+                limit = time.monotonic() + self.max_wait
+                if deadline is not None:
+                    limit = min(limit, deadline)
+                while self._running >= self.max_concurrent:
+                    remaining = limit - time.monotonic()
+                    if remaining <= 0:
+                        reason = 'deadline' if deadline is not None and limit == deadline else 'timeout'
+                        raise self._reject(reason, 503)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._running += 1
+            self.admitted += 1
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            with self._cond:
+                self._running -= 1
+                self.completed += 1
+                self._ewma = elapsed if self._ewma is None else (
+                    self.alpha * elapsed + (1 - self.alpha) * self._ewma)
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'waiting': self._waiting,
+                'admitted': self.admitted,
+                'completed': self.completed,
+                'shed': dict(self.shed),
+                'avg_ms': round(self._ewma * 1000, 2) if self._ewma is not None else None,
+            }
@@ -0,0 +1,125 @@
+"""
+Collaborative Filtering Module for Movie Recommendation System
+
+Builds an item-item similarity matrix from a MovieLens-style ratings file
+keyed by TMDB id. Ratings are read in chunks into a sparse user x item
+matrix, and similarities are computed with sparse matrix products over
+blocks of items, keeping only the top-K neighbors of each movie.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+class ItemItemModel:
+    def __init__(self, top_k=50, n_jobs=None, memory_limit_mb=512):
+        self.top_k = top_k
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.memory_limit_mb = memory_limit_mb
+        self.R = None
+        self.similarity = None
+
+    def build_user_item_matrix(self, ratings_path, tmdb_ids, chunksize=1_000_000,
+                               user_col='userId', item_col='tmdbId', rating_col='rating'):
+        """
+        Read ratings in chunks into a mean-centered user x item CSR matrix.
+
+        Items are the rows of the content model (tmdb_ids in row order);
+        ratings for movies outside the catalog are dropped.
+        """
+        print(f"\n⭐ Loading ratings from '{ratings_path}'...")
+        tmdb_ids = np.asarray(tmdb_ids, dtype=np.int64)
+        order = np.argsort(tmdb_ids)
+        sorted_ids = tmdb_ids[order]
+
+        users, items, values = [], [], []
+        total = 0
+        for chunk in pd.read_csv(ratings_path, usecols=[user_col, item_col, rating_col],
+                                 chunksize=chunksize):
+            chunk = chunk.dropna()
+            total += len(chunk)
+            ids = chunk[item_col].to_numpy(dtype=np.int64)
+
+            # Map TMDB ids to model rows with a binary search, no Python dict
+            pos = np.clip(np.searchsorted(sorted_ids, ids), 0, len(sorted_ids) - 1)
+            known = sorted_ids[pos] == ids
+            users.append(chunk[user_col].to_numpy(dtype=np.int64)[known])
+            items.append(order[pos[known]])
+            values.append(chunk[rating_col].to_numpy(dtype=np.float32)[known])
+
+        users = np.concatenate(users) if users else np.empty(0, dtype=np.int64)
+        items = np.concatenate(items) if items else np.empty(0, dtype=np.int64)
+        values = np.concatenate(values) if values else np.empty(0, dtype=np.float32)
+        user_ids, user_rows = np.unique(users, return_inverse=True)
+
+        # Repeat ratings (or two movieIds mapped to one tmdbId) are averaged,
+        # not summed as the sparse constructor would
+        pairs, pair_rows = np.unique(user_rows * len(tmdb_ids) + items, return_inverse=True)
+        means = np.bincount(pair_rows, weights=values) / np.bincount(pair_rows)
+        user_rows, items = np.divmod(pairs, len(tmdb_ids))
+
+        R = sp.csr_matrix((means.astype(np.float32), (user_rows, items)),
+                          shape=(len(user_ids), len(tmdb_ids)))
+
+        # Center each user's ratings so similarity reflects relative taste
+        counts = np.diff(R.indptr)
+        means = np.asarray(R.sum(axis=1)).ravel() / np.maximum(counts, 1)
+        R.data -= np.repeat(means, counts).astype(R.dtype)
+        R.eliminate_zeros()
+        self.R = R
+
+        print(f"✅ {R.nnz:,} of {total:,} ratings matched, "
+              f"{R.shape[0]:,} users x {R.shape[1]:,} movies")
+        return self
+
+    def _block_size(self, n_items):
+        """Items per block so every worker's dense similarity block fits the cap."""
+        per_row = n_items * 4 * 2  # float32 block + argpartition scratch
+        budget = self.memory_limit_mb * 1e6 / self.n_jobs
+        return int(max(1, min(n_items, budget // per_row)))
+
+    def compute_similarity(self):
+        """Cosine item-item similarity, pruned to the top-K per movie."""
+        print(f"\n🔗 Computing item-item similarity (top {self.top_k})...")
+        R = self.R.tocsc().astype(np.float32)
+        norms = np.sqrt(np.asarray(R.multiply(R).sum(axis=0)).ravel())
+        norms[norms == 0] = 1.0
+        Rn = R @ sp.diags(1.0 / norms).astype(np.float32)
+        Rn_t = Rn.T.tocsr()
+        Rn = Rn.tocsc()
+
+        n_items = Rn.shape[1]
+        k = min(self.top_k, n_items - 1)
+        block = self._block_size(n_items)
+
+        def work(start):
+            stop = min(start + block, n_items)
+            S = (Rn_t[start:stop] @ Rn).toarray()
+            S[np.arange(stop - start), np.arange(start, stop)] = 0  # no self-similarity
+            top = np.argpartition(-S, k - 1, axis=1)[:, :k] if k > 0 else np.empty((stop - start, 0), int)
+            sims = np.take_along_axis(S, top, axis=1)
+            keep = sims > 0
+            return np.count_nonzero(keep, axis=1), top[keep], sims[keep]
+
+        counts, indices, data = [], [], []
+        with ThreadPoolExecutor(max_workers=self.n_jobs) as pool:
+            for c, idx, sims in pool.map(work, range(0, n_items, block)):
+                counts.append(c)
+                indices.append(idx)
+                data.append(sims)
+
+        indptr = np.zeros(n_items + 1, dtype=np.int64)
+        np.cumsum(np.concatenate(counts), out=indptr[1:])
+        self.similarity = sp.csr_matrix(
+            (np.concatenate(data).astype(np.float32), np.concatenate(indices), indptr),
+            shape=(n_items, n_items)
+        )
+        self.similarity.sort_indices()
+
+        print(f"✅ Item-item similarity: {self.similarity.nnz:,} non-zeros "
+              f"({self.similarity.nnz / max(n_items, 1):.1f} per movie)")
+        return self
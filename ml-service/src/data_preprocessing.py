@@ -9,6 +9,10 @@ import ast
 import os
 
 
+MOVIES_FILE = 'tmdb_5000_movies.csv'
+CREDITS_FILE = 'tmdb_5000_credits.csv'
+
+
 class DataPreprocessor:
     def __init__(self, data_dir='data'):
         self.data_dir = data_dir
@@ -17,11 +21,13 @@ class DataPreprocessor:
     def load_datasets(self):
         """Load movies and credits datasets and merge them."""
         print("📂 Loading datasets...")
-        movies = pd.read_csv(f"{self.data_dir}/tmdb_5000_movies.csv")
-        credits = pd.read_csv(f"{self.data_dir}/tmdb_5000_credits.csv")
+        movies = pd.read_csv(f"{self.data_dir}/{MOVIES_FILE}")
+        credits = pd.read_csv(f"{self.data_dir}/{CREDITS_FILE}")
         
-        # Merge on 'title'
-        self.df = movies.merge(credits, on='title', how='inner')
+        # Merge on the TMDB id: titles are not unique (remakes, re-releases),
+        # so a title join fans out and then drops distinct films
+        credits = credits.rename(columns={'movie_id': 'id'}).drop(columns='title')
+        self.df = movies.merge(credits, on='id', how='inner')
         print(f"✅ Merged dataset shape: {self.df.shape}")
         return self
     
@@ -42,9 +48,9 @@ class DataPreprocessor:
         """Handle missing values in critical columns."""
         print("🔧 Handling missing values...")
         
-        # Remove duplicates
+        # Remove duplicates (same TMDB id; films sharing a title are kept)
         before = len(self.df)
-        self.df.drop_duplicates(subset='title', inplace=True)
+        self.df.drop_duplicates(subset='id', inplace=True)
         print(f"   Removed {before - len(self.df)} duplicate entries")
         
         # Fill missing text fields
@@ -98,6 +104,18 @@ class DataPreprocessor:
                 return entry.get('name', '').replace(" ", "")
         return ''
     
+    def get_primary_genre(self, obj_str):
+        """Return the first genre name (spaces kept) for display/plotting."""
+        try:
+            items = ast.literal_eval(obj_str)
+        except Exception:
+            return 'Unknown'
+        
+        for entry in items:
+            if isinstance(entry, dict) and entry.get('name'):
+                return entry['name']
+        return 'Unknown'
+    
     def extract_features(self):
         """Extract and combine text features for content-based filtering."""
         print("🔍 Extracting features...")
@@ -107,6 +125,7 @@ class DataPreprocessor:
         self.df['keywords_list'] = self.df['keywords'].apply(self.extract_names)
         self.df['cast_list'] = self.df['cast'].apply(lambda x: self.get_top_cast(x, top_n=3))
         self.df['director'] = self.df['crew'].apply(self.get_director)
+        self.df['primary_genre'] = self.df['genres'].apply(self.get_primary_genre)
         
         # Combine into content field
         def create_content(row):
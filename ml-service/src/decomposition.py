@@ -0,0 +1,138 @@
+"""
+Decomposition Module for Movie Recommendation System
+
+Randomized truncated SVD of the sparse TF-IDF matrix with the sparse
+matrix products split into row blocks and run on a thread pool (SciPy's
+sparse kernels release the GIL). One decomposition provides both the
+KNN embeddings and, through its leading components, the 2D/3D
+visualization coordinates.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import linalg
+
+
+def _svd_flip(Vt, U):
+    """Deterministic signs: the largest |loading| of each component is positive."""
+    signs = np.sign(Vt[np.arange(len(Vt)), np.argmax(np.abs(Vt), axis=1)])
+    signs[signs == 0] = 1
+    return Vt * signs[:, None], U * signs
+
+
+class RandomizedSVD:
+    """
+    Drop-in replacement for sklearn's TruncatedSVD(algorithm='randomized').
+
+    n_jobs threads compute X @ B and X.T @ B over row blocks of X. With
+    memory_limit_mb set, the dense sketches are kept in float32 and the
+    number of concurrent per-thread X.T @ B partial sums is capped so they
+    fit in the budget.
+    """
+
+    def __init__(self, n_components=100, n_oversamples=10, n_iter=5, n_jobs=None,
+                 memory_limit_mb=None, random_state=42):
+        self.n_components = n_components
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.memory_limit_mb = memory_limit_mb
+        self.random_state = random_state
+
+        self.components_ = None
+        self.singular_values_ = None
+        self.explained_variance_ = None
+        self.explained_variance_ratio_ = None
+
+    def _dtype(self):
+        return np.float32 if self.memory_limit_mb else np.float64
+
+    def _workers(self, n_features, width):
+        """Threads to use for X.T @ B, each holding an (n_features, width) partial sum."""
+        if not self.memory_limit_mb:
+            return self.n_jobs
+        partial_bytes = n_features * width * np.dtype(self._dtype()).itemsize
+        budget = self.memory_limit_mb * 1e6 / 4
+        return int(max(1, min(self.n_jobs, budget // max(partial_bytes, 1))))
+
+    def _row_blocks(self, X, n_blocks):
+        """Slice X into (start, stop, block) row blocks once, reused every pass."""
+        if n_blocks == 1:
+            return [(0, X.shape[0], X)]
+        bounds = np.linspace(0, X.shape[0], n_blocks + 1).astype(int)
+        return [(start, stop, X[start:stop])
+                for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+    def _dot(self, X, B, pool, blocks, out=None):
+        """X @ B with row blocks of X computed in parallel (optionally in place)."""
+        if out is None:
+            out = np.empty((X.shape[0], B.shape[1]), dtype=B.dtype)
+
+        def work(block):
+            start, stop, X_block = block
+            out[start:stop] = X_block @ B
+
+        list(pool.map(work, blocks))
+        return out
+
+    def _tdot(self, X, B, pool, blocks):
+        """X.T @ B as a sum of per-block partial products."""
+        def work(block):
+            start, stop, X_block = block
+            return X_block.T @ B[start:stop]
+
+        total = None
+        for partial in pool.map(work, blocks):
+            total = partial if total is None else total + partial
+        return np.asarray(total, dtype=B.dtype)
+
+    def fit_transform(self, X):
+        X = X.tocsr()
+        n_samples, n_features = X.shape
+        width = min(self.n_components + self.n_oversamples, min(n_samples, n_features))
+        dtype = self._dtype()
+        rng = np.random.default_rng(self.random_state)
+
+        # Total variance first, so its sparse temporaries don't stack on the sketches
+        column_means = np.asarray(X.mean(axis=0)).ravel()
+        squared_means = np.asarray(X.multiply(X).mean(axis=0)).ravel()
+        full_var = (squared_means - column_means ** 2).sum()
+
+        # One row block per thread, so at most `workers` X.T @ B partials are alive
+        workers = self._workers(n_features, width)
+        blocks = self._row_blocks(X, workers)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Range finder with power iterations; LU keeps them well conditioned
+            # at a fraction of the cost of a QR per step
+            Q = self._dot(X, rng.standard_normal((n_features, width), dtype=dtype), pool, blocks)
+            for _ in range(self.n_iter):
+                Q, _ = linalg.lu(Q, permute_l=True, overwrite_a=True, check_finite=False)
+                Z, _ = linalg.lu(self._tdot(X, Q, pool, blocks), permute_l=True,
+                                 overwrite_a=True, check_finite=False)
+                # Q is dead once Z exists, reuse its buffer for the next sketch
+                Q = self._dot(X, Z, pool, blocks, out=Q)
+            Q, _ = linalg.qr(Q, mode='economic', overwrite_a=True, check_finite=False)
+
+            # Project onto the range and take the SVD of the small matrix
+            B = self._tdot(X, Q, pool, blocks).T
+            U_hat, s, Vt = np.linalg.svd(B, full_matrices=False)
+
+        k = self.n_components
+        Vt, U_hat = _svd_flip(Vt[:k], U_hat[:, :k])
+        X_transformed = (Q @ U_hat) * s[:k]
+
+        self.components_ = Vt
+        self.singular_values_ = s[:k]
+        self.explained_variance_ = X_transformed.var(axis=0)
+        self.explained_variance_ratio_ = self.explained_variance_ / full_var
+        return X_transformed
+
+    def fit(self, X):
+        self.fit_transform(X)
+        return self
+
+    def transform(self, X):
+        return np.asarray(X @ self.components_.T)
@@ -0,0 +1,158 @@
+"""
+Near-Duplicate Detection Module for Movie Recommendation System
+
+Finds re-releases and near-duplicate catalog entries from each movie's
+`content` text with MinHash signatures over word shingles and LSH
+banding, so only movies sharing a band bucket are ever compared. The
+result is one cluster id per movie (the smallest row in its cluster),
+which serving uses to keep a single entry per cluster in results.
+"""
+
+import zlib
+
+import numpy as np
+
+
+CLUSTERS_FILE = 'duplicate_clusters.npy'
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(text, size=3):
+    """Distinct 32-bit hashes of a text's word `size`-grams (as uint64)."""
+    words = str(text).split()
+    if len(words) < size:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams),
+                                 dtype=np.uint64, count=len(grams)))
+
+
+def choose_bands(num_perm, threshold):
+    """
+    (bands, rows) with bands * rows == num_perm whose S-curve midpoint is
+    the highest one at or below threshold. Erring low only adds candidates,
+    which the signature check filters anyway; erring high misses duplicates.
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    below = [br for br in options if (1 / br[0]) ** (1 / br[1]) <= threshold]
+    return max(below or options[-1:], key=lambda br: (1 / br[0]) ** (1 / br[1]))
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = np.arange(n)
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        a, b = self.find(i), self.find(j)
+        if a != b:
+            # The smaller row becomes the root, so it is the cluster id
+            self.parent[max(a, b)] = min(a, b)
+
+
+class MinHashDeduplicator:
+    """
+    MinHash LSH near-duplicate clustering.
+
+    Pairs that land in the same bucket of any band are candidates; a
+    candidate is a duplicate when its estimated Jaccard similarity (the
+    share of equal signature slots) is at least `threshold`.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, shingle_size=3, chunk_size=200,
+                 max_bucket=100, random_state=42):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.chunk_size = chunk_size
+        self.max_bucket = max_bucket
+        self.random_state = random_state
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(random_state)
+        self._a = rng.integers(1, int(_MERSENNE), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE), size=num_perm, dtype=np.uint64)
+
+        self.signatures = None
+        self._empty = None
+        self.clusters = None
+        self.n_candidates = 0
+
+    def compute_signatures(self, texts):
+        """MinHash signature (num_perm uint32 values) for every text."""
+        sets = [shingles(t, self.shingle_size) for t in texts]
+        self._empty = np.array([len(s) == 0 for s in sets], dtype=bool)
+        signatures = np.full((len(sets), self.num_perm), _MAX_HASH, dtype=np.uint64)
+
+        # Hash all shingles of a chunk of movies at once, then take each
+        # movie's per-permutation minimum with reduceat
+        for start in range(0, len(sets), self.chunk_size):
+            chunk = sets[start:start + self.chunk_size]
+            lengths = np.array([len(s) for s in chunk])
+            nonempty = np.flatnonzero(lengths)
+            if not len(nonempty):
+                continue
+            values = np.concatenate([chunk[i] for i in nonempty])
+            with np.errstate(over='ignore'):
+                hashed = ((values[:, None] * self._a + self._b) % _MERSENNE) & _MAX_HASH
+            offsets = np.concatenate([[0], np.cumsum(lengths[nonempty])[:-1]])
+            signatures[start + nonempty] = np.minimum.reduceat(hashed, offsets, axis=0)
+
+        self.signatures = signatures.astype(np.uint32)
+        return self.signatures
+
+    def candidate_pairs(self):
+        """Row pairs that share a bucket in at least one LSH band."""
+        pairs = set()
+        for band in range(self.bands):
+            cols = self.signatures[:, band * self.rows:(band + 1) * self.rows]
+            keys = np.ascontiguousarray(cols).view(np.dtype((np.void, cols.dtype.itemsize * self.rows)))
+            _, bucket, counts = np.unique(keys.ravel(), return_inverse=True, return_counts=True)
+            # Movies without any text share the all-max signature, not content
+            shared = np.flatnonzero((counts[bucket] > 1) & ~self._empty)
+            if not len(shared):
+                continue
+            order = shared[np.argsort(bucket[shared], kind='stable')]
+            bounds = np.flatnonzero(np.diff(bucket[order])) + 1
+            for members in np.split(order, bounds):
+                members = members.tolist()
+                if len(members) < 2:
+                    continue
+                if len(members) <= self.max_bucket:
+                    pairs.update((i, j) for k, i in enumerate(members) for j in members[k + 1:])
+                else:
+                    # Huge buckets are near-constant bands (e.g. empty text):
+                    # chain neighbours instead of comparing every pair
+                    pairs.update(zip(members, members[1:]))
+        self.n_candidates = len(pairs)
+        return sorted(pairs)
+
+    def fit(self, texts):
+        """Cluster texts; returns the cluster id of every row."""
+        print(f"\n🧬 MinHash LSH near-duplicate detection "
+              f"({self.num_perm} permutations, {self.bands} bands x {self.rows} rows, "
+              f"threshold {self.threshold})...")
+        self.compute_signatures(texts)
+        uf = _UnionFind(len(self.signatures))
+
+        duplicates = 0
+        for i, j in self.candidate_pairs():
+            if np.mean(self.signatures[i] == self.signatures[j]) >= self.threshold:
+                uf.union(i, j)
+                duplicates += 1
+
+        self.clusters = np.array([uf.find(i) for i in range(len(self.signatures))], dtype=np.int32)
+        sizes = np.bincount(self.clusters, minlength=len(self.clusters))
+        print(f"✅ {self.n_candidates:,} candidate pairs, {duplicates:,} confirmed; "
+              f"{int((sizes > 1).sum()):,} duplicate clusters covering {int(sizes[sizes > 1].sum()):,} movies")
+        return self.clusters
@@ -0,0 +1,99 @@
+"""
+Response Encoding Module for Movie Recommendation System
+
+Content negotiation for the API. Besides the default row-per-movie JSON,
+results can be sent column-wise with shared URL prefixes sent once
+(compact JSON or MessagePack). orjson and msgpack are optional: without
+them the standard library encoder is used and MessagePack is not offered.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.movies.columnar+json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+FORMATS = {
+    'json': JSON_MIMETYPE,
+    'columnar': COLUMNAR_MIMETYPE,
+    'msgpack': MSGPACK_MIMETYPE,
+}
+
+
+def available_formats():
+    """Formats this process can produce, in server preference order."""
+    formats = ['json', 'columnar']
+    if msgpack is not None:
+        formats.insert(0, 'msgpack')
+    return formats
+
+
+def negotiate(accept_mimetypes, format_param=None):
+    """
+    Pick a response format from an explicit ?format= value or the Accept
+    header (a werkzeug MIMEAccept). Defaults to row JSON.
+    """
+    formats = available_formats()
+    if format_param:
+        return format_param if format_param in formats else None
+
+    offered = [FORMATS[f] for f in formats]
+    best = accept_mimetypes.best_match(offered, default=JSON_MIMETYPE)
+    # A bare "*/*" (browsers, curl) should keep getting plain JSON
+    if accept_mimetypes.best == '*/*' or best is None:
+        return 'json'
+    return next(f for f in formats if FORMATS[f] == best)
+
+
+def to_columnar(payload, rows_key, prefixes):
+    """
+    Turn payload[rows_key] (a list of dicts) into {column: [values]} and
+    strip each column's URL prefix, recorded once under "prefixes".
+    """
+    rows = payload.get(rows_key) or []
+    columns = {}
+    for key in (rows[0].keys() if rows else []):
+        values = [row.get(key) for row in rows]
+        prefix = prefixes.get(key)
+        if prefix:
+            values = [
+                v[len(prefix):] if isinstance(v, str) and v.startswith(prefix) else v
+                for v in values
+            ]
+        columns[key] = values
+
+    result = dict(payload)
+    result[rows_key] = columns
+    result['prefixes'] = {k: v for k, v in prefixes.items() if k in columns}
+    result['format'] = 'columnar'
+    return result
+
+
+def dumps_json(payload):
+    """Serialize to JSON bytes with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def encode(payload, fmt, rows_key=None, prefixes=None):
+    """Return (body bytes, mimetype) for a payload in the given format."""
+    if fmt != 'json' and rows_key:
+        payload = to_columnar(payload, rows_key, prefixes or {})
+
+    if fmt == 'msgpack':
+        return msgpack.packb(payload, use_bin_type=True), MSGPACK_MIMETYPE
+    if fmt == 'columnar':
+        return dumps_json(payload), COLUMNAR_MIMETYPE
+    return dumps_json(payload), JSON_MIMETYPE
@@ -9,6 +9,9 @@ import numpy as np
 import joblib
 import ast
 from collections import Counter
+from neighbors_job import top_k_block
+from quantization import QuantizedIndex, load_neighbor_index, normalize_rows
+from title_index import TitleIndex
 
 
 class ModelEvaluator:
@@ -20,12 +23,11 @@ class ModelEvaluator:
         """Load all necessary models and data."""
         print("📥 Loading models for evaluation...")
         
-        self.knn = joblib.load(f"{self.models_dir}/knn.joblib")
-        self.X_reduced = joblib.load(f"{self.models_dir}/X_reduced.joblib")
+        self.X_reduced, self.knn = load_neighbor_index(self.models_dir)
         self.meta = joblib.load(f"{self.models_dir}/meta.joblib")
         self.titles = joblib.load(f"{self.models_dir}/titles.joblib")
         
-        self.title_to_index = {t: i for i, t in enumerate(self.titles)}
+        self.title_index = TitleIndex.load_or_build(self.models_dir, self.titles)
         print("✅ Models loaded")
         
     def extract_genres(self, genres_str):
@@ -38,10 +40,10 @@ class ModelEvaluator:
     
     def get_recommendations(self, movie_title, n=5):
         """Get recommendations for a given movie."""
-        if movie_title not in self.title_to_index:
+        idx = self.title_index.get(movie_title)
+        if idx is None:
             return None
         
-        idx = self.title_to_index[movie_title]
         distances, indices = self.knn.kneighbors([self.X_reduced[idx]], n_neighbors=n+1)
         
         recommendations = []
@@ -64,7 +66,7 @@ class ModelEvaluator:
     
     def analyze_genre_similarity(self, input_movie, recommendations):
         """Analyze how similar the genres are."""
-        input_idx = self.title_to_index[input_movie]
+        input_idx = self.title_index.get(input_movie)
         input_genres = self.extract_genres(self.meta.iloc[input_idx]['genres'])
         
         print(f"\n   Input Movie Genres: {', '.join(input_genres)}")
@@ -141,6 +143,40 @@ class ModelEvaluator:
                 print("⚠️  Fair. The model could benefit from more tuning")
         
         print("="*70)
+    
+    def evaluate_quantization(self, methods=('int8', 'pq'), k=10, n_queries=500, rerank=200):
+        """Report memory saved vs. recall@K lost for each quantization method."""
+        print("\n" + "="*70)
+        print("🗜️  EVALUATING QUANTIZED EMBEDDINGS")
+        print("="*70)
+        
+        X = np.asarray(self.X_reduced)
+        rng = np.random.default_rng(42)
+        queries = rng.choice(len(X), size=min(n_queries, len(X)), replace=False)
+        
+        # Exact cosine top-K as ground truth, in column tiles rather than
+        # one n_queries x n similarity matrix
+        X_norm = normalize_rows(X)
+        exact, _ = top_k_block(X_norm[queries], X_norm, k, tile_cols=4096)
+        
+        results = {}
+        for method in methods:
+            index = QuantizedIndex.build(X, method=method, rerank=rerank)
+            approx = index.kneighbors(X[queries], n_neighbors=k, return_distance=False)
+            hits = sum(len(set(a) & set(e)) for a, e in zip(approx, exact))
+            recall = hits / (len(queries) * k)
+            
+            report = index.memory_report()
+            saved = 1 - report['code_bytes'] / report['float64_bytes']
+            results[method] = {**report, 'recall_at_k': recall}
+            
+            print(f"\n   {method}:")
+            print(f"      └─ Bytes/movie: {report['bytes_per_movie']:.0f} (float64: {X.shape[1] * 8})")
+            print(f"      └─ Memory saved: {saved:.1%}")
+            print(f"      └─ Recall@{k} (re-rank {rerank}): {recall:.3f}")
+        
+        print("="*70)
+        return results
 
 
 def main():
@@ -155,6 +191,7 @@ def main():
     ]
     
     evaluator.evaluate_sample_movies(sample_movies)
+    evaluator.evaluate_quantization()
 
 
 if __name__ == "__main__":
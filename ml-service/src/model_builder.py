@@ -6,12 +6,27 @@ This module builds the ML model using TF-IDF, PCA/SVD, and KNN.
 
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 import joblib
 import os
+import argparse
+import time
+import tracemalloc
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.decomposition import TruncatedSVD, PCA
 from sklearn.neighbors import NearestNeighbors
-from data_preprocessing import DataPreprocessor
+import data_preprocessing
+from data_preprocessing import DataPreprocessor, MOVIES_FILE, CREDITS_FILE
+from pipeline import StageCache, file_digest
+import decomposition
+from decomposition import RandomizedSVD
+import collaborative
+from collaborative import ItemItemModel
+import dedup
+from dedup import CLUSTERS_FILE, MinHashDeduplicator
+from quantization import QuantizedIndex, QUANTIZED_FILES, load_neighbor_index
+from title_index import TitleIndex
+from serving import SERVING_DIR, SIMILARITY_FILE, export_serving_model
 
 
 class MovieRecommenderModel:
@@ -21,8 +36,6 @@ class MovieRecommenderModel:
         
         self.vectorizer = None
         self.svd = None
-        self.pca_2d = None
-        self.pca_3d = None
         self.X = None
         self.X_reduced = None
         self.X_pca_2d = None
@@ -31,42 +44,49 @@ class MovieRecommenderModel:
         self.df = None
         self.meta = None
         self.titles = []
+        self.title_index = None
+        self.genre_labels = None
+        self.item_similarity = None
+        self.duplicate_clusters = None
         
-    def build_vectorizer(self, df):
+    def build_vectorizer(self, df, ngram_range=(1, 2), min_df=3, max_features=30000):
         """Create TF-IDF vectors from content."""
         print("\n🔤 Converting text to TF-IDF vectors...")
         
         self.vectorizer = TfidfVectorizer(
-            ngram_range=(1, 2),
-            min_df=3,
+            ngram_range=ngram_range,
+            min_df=min_df,
             stop_words='english',
-            max_features=30000
+            max_features=max_features
         )
         
         self.X = self.vectorizer.fit_transform(df['content'])
         print(f"✅ TF-IDF matrix shape: {self.X.shape}")
         return self
     
-    def apply_dimensionality_reduction(self):
-        """Apply SVD for model and PCA for visualization."""
+    def apply_dimensionality_reduction(self, n_components=100, n_jobs=None, memory_limit_mb=None):
+        """
+        Apply one randomized SVD for the model and the visualizations.
+        
+        The leading components of the decomposition are the top-2/top-3
+        singular directions, so the 2D/3D plot coordinates are sliced from
+        the model embeddings instead of fitting two more SVDs.
+        """
         print("\n🎛️  Applying dimensionality reduction...")
         
-        # TruncatedSVD for the main model (works with sparse matrices)
-        print("   - TruncatedSVD (100 components) for KNN model...")
-        self.svd = TruncatedSVD(n_components=100, random_state=42)
+        print(f"   - Randomized SVD ({n_components} components) for KNN model and visualizations...")
+        self.svd = RandomizedSVD(
+            n_components=n_components,
+            n_jobs=n_jobs,
+            memory_limit_mb=memory_limit_mb,
+            random_state=42
+        )
         self.X_reduced = self.svd.fit_transform(self.X)
         explained_var = sum(self.svd.explained_variance_ratio_)
         print(f"     Explained variance: {explained_var:.2%}")
         
-        # PCA for 2D visualization
-        print("   - PCA (2 components) for 2D visualization...")
-        self.pca_2d = TruncatedSVD(n_components=2, random_state=42)
-        self.X_pca_2d = self.pca_2d.fit_transform(self.X)
-        
-        # PCA for 3D visualization
-        print("   - PCA (3 components) for 3D visualization...")
-        self.pca_3d = TruncatedSVD(n_components=3, random_state=42)
-        self.X_pca_3d = self.pca_3d.fit_transform(self.X)
+        self.X_pca_2d = self.X_reduced[:, :2]
+        self.X_pca_3d = self.X_reduced[:, :3]
         
         print(f"✅ Dimensionality reduction complete")
         print(f"   - Model features: {self.X_reduced.shape}")
@@ -74,12 +94,12 @@ class MovieRecommenderModel:
         print(f"   - 3D visualization: {self.X_pca_3d.shape}")
         return self
     
-    def build_knn_model(self):
+    def build_knn_model(self, n_neighbors=6):
         """Build KNN model using cosine similarity."""
         print("\n🤖 Training KNN model...")
         
         self.knn = NearestNeighbors(
-            n_neighbors=6,
+            n_neighbors=n_neighbors,
             metric='cosine',
             algorithm='brute'
         )
@@ -88,75 +108,157 @@ class MovieRecommenderModel:
         print("✅ KNN model trained successfully")
         return self
     
-    def save_models(self):
-        """Save all model artifacts."""
+    def build_collaborative_model(self, ratings_path, top_k=50, n_jobs=None, memory_limit_mb=512):
+        """Build the item-item similarity matrix from a ratings file."""
+        cf = ItemItemModel(top_k=top_k, n_jobs=n_jobs, memory_limit_mb=memory_limit_mb)
+        cf.build_user_item_matrix(ratings_path, self.meta['id'].to_numpy()) \
+          .compute_similarity()
+        self.item_similarity = cf.similarity
+        return self
+    
+    def detect_duplicates(self, df, threshold=0.8, num_perm=128):
+        """Cluster near-duplicate movies (re-releases, duplicate entries) by content."""
+        deduplicator = MinHashDeduplicator(threshold=threshold, num_perm=num_perm)
+        self.duplicate_clusters = deduplicator.fit(df['content'].tolist())
+        return self
+    
+    def encode_genre_labels(self, df):
+        """Encode each movie's primary genre once so plots don't reparse it."""
+        codes, names = pd.factorize(df['primary_genre'], sort=True)
+        self.genre_labels = {
+            'codes': codes.astype(np.int16),
+            'names': list(names)
+        }
+        return self
+    
+    def save_models(self, quantization=None):
+        """
+        Save all model artifacts.
+        
+        With quantization='int8' or 'pq' the embeddings are stored as
+        compressed codes plus a memory-mappable X_reduced.npy, and the KNN
+        model (which holds a second float64 copy) is not written.
+        """
         print(f"\n💾 Saving models to '{self.models_dir}'...")
         
         artifacts = {
             'vectorizer.joblib': self.vectorizer,
             'svd.joblib': self.svd,
-            'pca_2d.joblib': self.pca_2d,
-            'pca_3d.joblib': self.pca_3d,
             'X_reduced.joblib': self.X_reduced,
             'X_pca_2d.joblib': self.X_pca_2d,
             'X_pca_3d.joblib': self.X_pca_3d,
             'knn.joblib': self.knn,
             'meta.joblib': self.meta,
-            'titles.joblib': self.titles
+            'titles.joblib': self.titles,
+            'genre_labels.joblib': self.genre_labels
         }
         
+        if quantization:
+            # Remove the float64 copies an unquantized run left behind
+            for filename in ('X_reduced.joblib', 'knn.joblib'):
+                del artifacts[filename]
+                path = os.path.join(self.models_dir, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+        
         for filename, obj in artifacts.items():
             path = os.path.join(self.models_dir, filename)
             joblib.dump(obj, path)
             print(f"   ✓ {filename}")
         
+        for filename in self.title_index.save(self.models_dir):
+            print(f"   ✓ {filename}")
+        
+        similarity_path = os.path.join(self.models_dir, SIMILARITY_FILE)
+        if self.item_similarity is not None:
+            sp.save_npz(similarity_path, self.item_similarity)
+            print(f"   ✓ {SIMILARITY_FILE}")
+        elif os.path.exists(similarity_path):
+            # Built for an earlier run (and possibly another catalog)
+            os.remove(similarity_path)
+        
+        clusters_path = os.path.join(self.models_dir, CLUSTERS_FILE)
+        if self.duplicate_clusters is not None:
+            np.save(clusters_path, self.duplicate_clusters)
+            print(f"   ✓ {CLUSTERS_FILE}")
+        elif os.path.exists(clusters_path):
+            os.remove(clusters_path)
+        
+        if quantization:
+            index = QuantizedIndex.build(self.X_reduced, method=quantization)
+            for filename in index.save(self.models_dir):
+                print(f"   ✓ {filename}")
+            report = index.memory_report()
+            print(f"   Embeddings: {report['float64_bytes'] / 1e6:.1f} MB float64 -> "
+                  f"{report['code_bytes'] / 1e6:.1f} MB {report['method']} codes")
+        else:
+            # Remove a stale quantized index so loaders pick up the new KNN model
+            for filename in QUANTIZED_FILES:
+                path = os.path.join(self.models_dir, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+        
         print("✅ All artifacts saved successfully")
         return self
     
+    def export_serving_artifacts(self, n_neighbors=20, n_jobs=None, memory_limit_mb=None):
+        """Export NumPy-only artifacts for the lean serving runtime."""
+        serving_dir = os.path.join(self.models_dir, SERVING_DIR)
+        print(f"\n📦 Exporting serving artifacts to '{serving_dir}'...")
+        
+        files = export_serving_model(
+            serving_dir,
+            X_reduced=self.X_reduced,
+            meta=self.meta,
+            titles=self.titles,
+            title_index=self.title_index,
+            svd=self.svd,
+            vectorizer_path=os.path.join(self.models_dir, 'vectorizer.joblib'),
+            item_similarity=self.item_similarity,
+            duplicate_clusters=self.duplicate_clusters,
+            n_neighbors=n_neighbors,
+            n_jobs=n_jobs,
+            memory_limit_mb=memory_limit_mb
+        )
+        for filename in files:
+            print(f"   ✓ {filename}")
+        
+        print("✅ Serving artifacts exported")
+        return self
+    
     def load_models(self):
         """Load all model artifacts."""
         print(f"\n📥 Loading models from '{self.models_dir}'...")
         
         self.vectorizer = joblib.load(f"{self.models_dir}/vectorizer.joblib")
         self.svd = joblib.load(f"{self.models_dir}/svd.joblib")
-        self.pca_2d = joblib.load(f"{self.models_dir}/pca_2d.joblib")
-        self.pca_3d = joblib.load(f"{self.models_dir}/pca_3d.joblib")
-        self.X_reduced = joblib.load(f"{self.models_dir}/X_reduced.joblib")
+        self.X_reduced, self.knn = load_neighbor_index(self.models_dir)
         self.X_pca_2d = joblib.load(f"{self.models_dir}/X_pca_2d.joblib")
         self.X_pca_3d = joblib.load(f"{self.models_dir}/X_pca_3d.joblib")
-        self.knn = joblib.load(f"{self.models_dir}/knn.joblib")
         self.meta = joblib.load(f"{self.models_dir}/meta.joblib")
         self.titles = joblib.load(f"{self.models_dir}/titles.joblib")
+        self.title_index = TitleIndex.load_or_build(self.models_dir, self.titles)
+        # Models trained before genre labels were saved do not have them
+        labels_path = f"{self.models_dir}/genre_labels.joblib"
+        self.genre_labels = joblib.load(labels_path) if os.path.exists(labels_path) else None
         
-        print("✅ All models loaded successfully")
-        return self
-    
-    def train(self, df, meta):
-        """Complete training pipeline."""
-        print("\n" + "="*60)
-        print("🚀 Starting Model Training Pipeline")
-        print("="*60)
-        
-        self.df = df
-        self.meta = meta
-        self.titles = df['title'].tolist()
+        similarity_path = os.path.join(self.models_dir, SIMILARITY_FILE)
+        if os.path.exists(similarity_path):
+            self.item_similarity = sp.load_npz(similarity_path)
         
-        self.build_vectorizer(df) \
-            .apply_dimensionality_reduction() \
-            .build_knn_model() \
-            .save_models()
+        clusters_path = os.path.join(self.models_dir, CLUSTERS_FILE)
+        if os.path.exists(clusters_path):
+            self.duplicate_clusters = np.load(clusters_path)
         
-        print("\n" + "="*60)
-        print("🎉 Training Complete!")
-        print("="*60)
+        print("✅ All models loaded successfully")
         return self
     
     def recommend(self, movie_title, n=5):
         """Get recommendations for a movie."""
-        if movie_title not in self.titles:
+        idx = self.title_index.get(movie_title)
+        if idx is None:
             return None
         
-        idx = self.titles.index(movie_title)
         distances, indices = self.knn.kneighbors([self.X_reduced[idx]], n_neighbors=n+1)
         
         recommendations = []
@@ -171,28 +273,212 @@ class MovieRecommenderModel:
         return recommendations[:n]
 
 
+def benchmark_dimensionality_reduction(X, n_components=100, n_jobs=None, memory_limit_mb=None):
+    """Compare wall time and peak memory of the old 3-SVD path vs. one randomized SVD."""
+    def legacy():
+        for k in (n_components, 2, 3):
+            TruncatedSVD(n_components=k, random_state=42).fit_transform(X)
+    
+    def single():
+        RandomizedSVD(n_components=n_components, n_jobs=n_jobs, random_state=42).fit_transform(X)
+    
+    def bounded():
+        RandomizedSVD(n_components=n_components, n_jobs=n_jobs,
+                      memory_limit_mb=memory_limit_mb or 256, random_state=42).fit_transform(X)
+    
+    print("\n" + "="*60)
+    print("📏 Dimensionality Reduction Benchmark")
+    print("="*60)
+    print(f"   TF-IDF matrix: {X.shape}, {X.nnz:,} non-zeros")
+    
+    results = {}
+    for name, fn in [('3x TruncatedSVD', legacy), ('1x RandomizedSVD', single),
+                     ('1x RandomizedSVD (bounded)', bounded)]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {'seconds': seconds, 'peak_mb': peak / 1e6}
+        print(f"   {name:<28} {seconds:8.2f}s  peak {peak / 1e6:8.1f} MB")
+    
+    print("="*60)
+    return results
+
+
+def run_pipeline(data_dir, models_dir, cache, n_components=100, n_neighbors=6,
+                 max_features=30000, quantization=None, n_jobs=None, memory_limit_mb=None,
+                 ratings_path=None, cf_top_k=50, dedup_threshold=0.8):
+    """
+    Run the training pipeline as cached stages.
+    
+    load -> clean -> extract -> dedup/tfidf -> svd -> knn are cached by the
+    hash of their inputs and parameters; saving the artifacts always runs.
+    dedup_threshold=None skips near-duplicate detection.
+    """
+    # Code digests, so editing a module invalidates the stages it implements
+    preprocessing_code = file_digest([data_preprocessing.__file__])
+    model_code = file_digest([os.path.abspath(__file__)])
+    datasets = file_digest([os.path.join(data_dir, MOVIES_FILE),
+                            os.path.join(data_dir, CREDITS_FILE)])
+    
+    preprocessor = DataPreprocessor(data_dir=data_dir)
+    
+    def load():
+        return preprocessor.load_datasets().df
+    
+    def clean():
+        preprocessor.df = loaded.value.copy()
+        return preprocessor.drop_irrelevant_columns() \
+                           .handle_missing_values() \
+                           .df
+    
+    def extract():
+        preprocessor.df = cleaned.value.copy()
+        preprocessor.extract_features()
+        return preprocessor.get_processed_data(), preprocessor.get_metadata()
+    
+    loaded = cache.run('load', load, params={'code': preprocessing_code}, inputs=[datasets])
+    cleaned = cache.run('clean', clean, params={'code': preprocessing_code}, inputs=[loaded.key])
+    extracted = cache.run('extract', extract, params={'code': preprocessing_code},
+                          inputs=[cleaned.key])
+    df, meta = extracted.value
+    
+    model = MovieRecommenderModel(models_dir=models_dir)
+    model.df = df
+    model.meta = meta
+    model.titles = df['title'].tolist()
+    model.title_index = TitleIndex.build(model.titles)
+    model.encode_genre_labels(df)
+    
+    if dedup_threshold:
+        def duplicates():
+            model.detect_duplicates(df, threshold=dedup_threshold)
+            return model.duplicate_clusters
+        
+        stage = cache.run('dedup', duplicates,
+                          params={'code': file_digest([dedup.__file__]), 'threshold': dedup_threshold},
+                          inputs=[extracted.key])
+        model.duplicate_clusters = stage.value
+    
+    def tfidf():
+        model.build_vectorizer(df, max_features=max_features)
+        return model.vectorizer, model.X
+    
+    def svd():
+        model.apply_dimensionality_reduction(n_components=n_components, n_jobs=n_jobs,
+                                             memory_limit_mb=memory_limit_mb)
+        return model.svd, model.X_reduced
+    
+    def knn():
+        model.build_knn_model(n_neighbors=n_neighbors)
+        return model.knn
+    
+    stage = cache.run('tfidf', tfidf, params={'code': model_code, 'max_features': max_features},
+                      inputs=[extracted.key])
+    model.vectorizer, model.X = stage.value
+    
+    # n_jobs only changes speed, so it is not part of the cache key
+    svd_code = file_digest([os.path.abspath(__file__), decomposition.__file__])
+    stage = cache.run('svd', svd, params={'code': svd_code, 'n_components': n_components,
+                                          'memory_limit_mb': memory_limit_mb},
+                      inputs=[stage.key])
+    model.svd, model.X_reduced = stage.value
+    model.X_pca_2d = model.X_reduced[:, :2]
+    model.X_pca_3d = model.X_reduced[:, :3]
+    
+    stage = cache.run('knn', knn, params={'code': model_code, 'n_neighbors': n_neighbors},
+                      inputs=[stage.key])
+    model.knn = stage.value
+    
+    if ratings_path:
+        def ratings():
+            model.build_collaborative_model(ratings_path, top_k=cf_top_k, n_jobs=n_jobs,
+                                            memory_limit_mb=memory_limit_mb or 512)
+            return model.item_similarity
+        
+        stage = cache.run('ratings', ratings,
+                          params={'code': file_digest([collaborative.__file__]),
+                                  'top_k': cf_top_k},
+                          inputs=[file_digest([ratings_path]), extracted.key])
+        model.item_similarity = stage.value
+    
+    cache.run_uncached('save', lambda: model.save_models(quantization=quantization)
+                                            .export_serving_artifacts(n_jobs=n_jobs,
+                                                                      memory_limit_mb=memory_limit_mb))
+    return model
+
+
 def main():
     """Main execution for building the model."""
+    parser = argparse.ArgumentParser(description="Train the movie recommender model")
+    parser.add_argument('--quantize', choices=['int8', 'pq'], default=None,
+                        help="Store embeddings as int8 or product-quantized codes "
+                             "(served in full mode; the lean export keeps float32)")
+    parser.add_argument('--n-components', type=int, default=100,
+                        help="SVD components used for the KNN embeddings")
+    parser.add_argument('--n-neighbors', type=int, default=6,
+                        help="Neighbors stored on the KNN model")
+    parser.add_argument('--max-features', type=int, default=30000,
+                        help="TF-IDF vocabulary size")
+    parser.add_argument('--n-jobs', type=int, default=None,
+                        help="Threads for the SVD sparse matrix products (default: all cores)")
+    parser.add_argument('--memory-limit-mb', type=int, default=None,
+                        help="Run the SVD in memory-bounded mode (float32, capped partial sums)")
+    parser.add_argument('--benchmark-svd', action='store_true',
+                        help="Compare the old 3-SVD path with the single randomized SVD")
+    parser.add_argument('--ratings', default=None,
+                        help="MovieLens-style ratings CSV (userId, tmdbId, rating) for the item-item model")
+    parser.add_argument('--cf-top-k', type=int, default=50,
+                        help="Item-item neighbors kept per movie")
+    parser.add_argument('--force', action='store_true',
+                        help="Recompute every stage, ignoring (and refreshing) the cache")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Do not read or write the stage cache")
+    parser.add_argument('--dedup-threshold', type=float, default=0.8,
+                        help="Estimated Jaccard similarity above which movies count as near-duplicates")
+    parser.add_argument('--no-dedup', action='store_true',
+                        help="Skip MinHash near-duplicate detection")
+    parser.add_argument('--variant', default=None,
+                        help="Write the artifacts to models/<variant>/ to serve them as a named variant")
+    args = parser.parse_args()
+    
     # Get the directory where this script is located
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)  # Go up one level from src/
     
     data_dir = os.path.join(project_root, 'data')
     models_dir = os.path.join(project_root, 'models')
+    if args.variant:
+        models_dir = os.path.join(models_dir, args.variant)
+    cache_dir = os.path.join(project_root, '.cache', 'pipeline')
     
-    # Load and preprocess data
-    preprocessor = DataPreprocessor(data_dir=data_dir)
-    preprocessor.load_datasets() \
-                .drop_irrelevant_columns() \
-                .handle_missing_values() \
-                .extract_features()
+    # Load, preprocess and train through the stage cache
+    print("\n" + "="*60)
+    print("🚀 Starting Model Training Pipeline")
+    print("="*60)
     
-    df = preprocessor.get_processed_data()
-    meta = preprocessor.get_metadata()
+    cache = StageCache(cache_dir, force=args.force, enabled=not args.no_cache)
+    model = run_pipeline(
+        data_dir,
+        models_dir,
+        cache,
+        n_components=args.n_components,
+        n_neighbors=args.n_neighbors,
+        max_features=args.max_features,
+        quantization=args.quantize,
+        n_jobs=args.n_jobs,
+        memory_limit_mb=args.memory_limit_mb,
+        ratings_path=args.ratings,
+        cf_top_k=args.cf_top_k,
+        dedup_threshold=None if args.no_dedup else args.dedup_threshold
+    )
+    cache.print_summary()
     
-    # Build and train model
-    model = MovieRecommenderModel(models_dir=models_dir)
-    model.train(df, meta)
+    if args.benchmark_svd:
+        benchmark_dimensionality_reduction(model.X, n_components=args.n_components,
+                                           n_jobs=args.n_jobs, memory_limit_mb=args.memory_limit_mb)
     
     # Test recommendation
     print("\n📽️  Testing recommendation...")
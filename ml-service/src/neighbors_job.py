@@ -0,0 +1,178 @@
+"""
+All-Pairs Neighbors Job for Movie Recommendation System
+
+Computes every movie's top-K cosine neighbors in one batch. Query rows
+are processed in blocks: each block is multiplied against column tiles
+of the embedding matrix (one GEMM per tile) and a running top-K is kept
+with argpartition, so the full n x n similarity matrix never exists.
+Blocks run on a process pool that reads the embeddings from shared
+memory and writes straight into memory-mapped .npy outputs.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+NEIGHBORS_IDX_FILE = 'neighbors_idx.npy'
+NEIGHBORS_DIST_FILE = 'neighbors_dist.npy'
+
+# Scratch bytes per similarity tile element: the float32 scores, their
+# negation and argpartition's int64 indices
+_TILE_BYTES = 16
+_ROW_BLOCK = 512
+
+_worker = {}
+
+
+def top_k_block(Q, X, k, tile_cols):
+    """
+    Exact top-k of Q's rows against every row of X by dot product.
+    Returns (indices, similarities), each (len(Q), k), best first.
+    """
+    b = len(Q)
+    best_idx = np.empty((b, 0), dtype=np.int64)
+    best_sim = np.empty((b, 0), dtype=np.float32)
+
+    for start in range(0, len(X), tile_cols):
+        S = Q @ X[start:start + tile_cols].T
+        kk = min(k, S.shape[1])
+        part = np.argpartition(-S, kk - 1, axis=1)[:, :kk]
+
+        cand_idx = np.concatenate([best_idx, part + start], axis=1)
+        cand_sim = np.concatenate([best_sim, np.take_along_axis(S, part, axis=1)], axis=1)
+        if cand_idx.shape[1] > k:
+            keep = np.argpartition(-cand_sim, k - 1, axis=1)[:, :k]
+            cand_idx = np.take_along_axis(cand_idx, keep, axis=1)
+            cand_sim = np.take_along_axis(cand_sim, keep, axis=1)
+        best_idx, best_sim = cand_idx, cand_sim
+
+    order = np.argsort(-best_sim, axis=1, kind='stable')
+    return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_sim, order, axis=1)
+
+
+def _attach(shm_name, shape, idx_path, dist_path, k, tile_cols, pooled=True):
+    """Pool initializer: map the shared embeddings and the output files once."""
+    if pooled:
+        try:
+            from threadpoolctl import threadpool_limits
+            # One BLAS thread per worker process; the pool provides the parallelism
+            _worker['blas_limits'] = threadpool_limits(1)
+        except ImportError:
+            pass
+    shm = SharedMemory(name=shm_name)
+    _worker.update(
+        shm=shm,
+        X=np.ndarray(shape, dtype=np.float32, buffer=shm.buf),
+        idx=np.load(idx_path, mmap_mode='r+'),
+        dist=np.load(dist_path, mmap_mode='r+'),
+        k=k,
+        tile_cols=tile_cols,
+    )
+
+
+def _run_block(start, stop):
+    X = _worker['X']
+    idx, sim = top_k_block(X[start:stop], X, _worker['k'], _worker['tile_cols'])
+    _worker['idx'][start:stop] = idx
+    _worker['dist'][start:stop] = np.clip(1.0 - sim, 0.0, 2.0)
+    return stop - start
+
+
+def plan_blocks(n, dim, k, n_jobs, memory_limit_mb, row_block=_ROW_BLOCK):
+    """
+    Pick (workers, row block, tile columns) so the shared embeddings plus
+    every worker's similarity tile stay under memory_limit_mb.
+    """
+    budget = memory_limit_mb * 1e6 - n * dim * 4
+    min_tile = max(k, 1) * _TILE_BYTES
+    if budget < min_tile:
+        raise MemoryError(
+            f"memory_limit_mb={memory_limit_mb} cannot hold the {n * dim * 4 / 1e6:.0f} MB embeddings"
+        )
+
+    workers = int(max(1, min(n_jobs, -(-n // row_block), budget // min_tile)))
+    tile_elems = budget / workers / _TILE_BYTES
+    rows = int(max(1, min(n, row_block, tile_elems // max(k, 1))))
+    cols = int(max(min(k, n), min(n, tile_elems // rows)))
+    return workers, rows, cols
+
+
+def all_pairs_neighbors(X, k, out_dir, n_jobs=None, memory_limit_mb=1024, row_block=_ROW_BLOCK):
+    """
+    Write each row's k nearest rows by cosine distance (itself included,
+    like NearestNeighbors.kneighbors on the training data) to
+    neighbors_idx.npy (int32) and neighbors_dist.npy (float32) in out_dir,
+    and return both memory-mapped.
+    """
+    n, dim = X.shape
+    k = min(k, n)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    workers, rows, cols = plan_blocks(n, dim, k, n_jobs, memory_limit_mb or 1024, row_block)
+    print(f"\n🧮 All-pairs top-{k} neighbors for {n:,} movies "
+          f"({workers} workers, {rows} x {cols} tiles, {memory_limit_mb or 1024} MB cap)...")
+
+    os.makedirs(out_dir, exist_ok=True)
+    idx_path = os.path.join(out_dir, NEIGHBORS_IDX_FILE)
+    dist_path = os.path.join(out_dir, NEIGHBORS_DIST_FILE)
+    np.lib.format.open_memmap(idx_path, mode='w+', dtype=np.int32, shape=(n, k)).flush()
+    np.lib.format.open_memmap(dist_path, mode='w+', dtype=np.float32, shape=(n, k)).flush()
+
+    # Normalize straight into shared memory, a block at a time
+    shm = SharedMemory(create=True, size=max(n * dim * 4, 1))
+    try:
+        Xs = np.ndarray((n, dim), dtype=np.float32, buffer=shm.buf)
+        for start in range(0, n, rows):
+            block = np.asarray(X[start:start + rows], dtype=np.float32)
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            Xs[start:start + rows] = block / norms
+
+        initargs = (shm.name, (n, dim), idx_path, dist_path, k, cols)
+        starts = range(0, n, rows)
+        if workers == 1:
+            _attach(*initargs, pooled=False)
+            try:
+                for start in starts:
+                    _run_block(start, min(start + rows, n))
+            finally:
+                _worker.pop('shm').close()
+                _worker.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                     initargs=initargs) as pool:
+                list(pool.map(_run_block, starts, [min(s + rows, n) for s in starts]))
+        del Xs
+    finally:
+        shm.close()
+        shm.unlink()
+
+    print("✅ Neighbor table written")
+    return np.load(idx_path, mmap_mode='r'), np.load(dist_path, mmap_mode='r')
+
+
+def main():
+    """Recompute the neighbor table from the exported serving embeddings."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    models_dir = os.path.join(os.path.dirname(script_dir), 'models')
+
+    parser = argparse.ArgumentParser(description="Compute every movie's top-K neighbors")
+    parser.add_argument('--embeddings', default=os.path.join(models_dir, 'serving', 'embeddings.npy'),
+                        help="(n, d) .npy embeddings")
+    parser.add_argument('--out', default=os.path.join(models_dir, 'neighbors'),
+                        help="Output directory for neighbors_idx.npy / neighbors_dist.npy")
+    parser.add_argument('-k', type=int, default=21, help="Neighbors per movie, itself included")
+    parser.add_argument('--n-jobs', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--memory-limit-mb', type=int, default=1024,
+                        help="Ceiling for the shared embeddings plus all similarity tiles")
+    args = parser.parse_args()
+
+    X = np.load(args.embeddings, mmap_mode='r')
+    all_pairs_neighbors(X, args.k, args.out, n_jobs=args.n_jobs, memory_limit_mb=args.memory_limit_mb)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Pipeline Cache Module for Movie Recommendation System
+
+Runs training stages through a content-addressed on-disk cache. Each
+stage's key is a hash of its name, parameters and the keys of the stages
+(or files) it depends on, so changing a parameter only recomputes that
+stage and everything downstream of it.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+
+import joblib
+
+
+StageResult = namedtuple('StageResult', ['value', 'key'])
+
+
+def file_digest(paths):
+    """Hash the contents of input files (datasets, source code)."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StageCache:
+    def __init__(self, cache_dir, force=False, enabled=True):
+        self.cache_dir = cache_dir
+        self.force = force
+        self.enabled = enabled
+        self.timings = []
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def stage_key(self, name, params=None, inputs=()):
+        """Content address of a stage: name + params + upstream keys."""
+        payload = json.dumps(
+            {'stage': name, 'params': params or {}, 'inputs': list(inputs)},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def run(self, name, fn, params=None, inputs=()):
+        """
+        Return the cached output of a stage, or compute and cache it.
+
+        `fn` is called with no arguments; `inputs` are the keys of the
+        StageResults (or file digests) it reads.
+        """
+        key = self.stage_key(name, params, inputs)
+        path = os.path.join(self.cache_dir, f"{name}-{key[:16]}.joblib")
+        start = time.perf_counter()
+
+        if self.enabled and not self.force and os.path.exists(path):
+            value = joblib.load(path)
+            status = 'hit'
+        else:
+            value = fn()
+            status = 'miss'
+            if self.enabled:
+                joblib.dump(value, path)
+
+        self.timings.append((name, status, time.perf_counter() - start))
+        return StageResult(value, key)
+
+    def run_uncached(self, name, fn):
+        """Run a side-effecting stage (e.g. saving artifacts) and time it."""
+        start = time.perf_counter()
+        value = fn()
+        self.timings.append((name, 'run', time.perf_counter() - start))
+        return value
+
+    def print_summary(self):
+        """Print per-stage cache status and wall time."""
+        print("\n" + "="*60)
+        print("⏱️  Pipeline Stage Summary")
+        print("="*60)
+        for name, status, seconds in self.timings:
+            icon = {'hit': '✓', 'miss': '⟳'}.get(status, '•')
+            print(f"   {icon} {name:<12} {status:<5} {seconds:8.2f}s")
+
+        cached = [status for _, status, _ in self.timings if status != 'run']
+        total = sum(seconds for _, _, seconds in self.timings)
+        print(f"   {cached.count('hit')}/{len(cached)} cache hits, {total:.2f}s total")
+        print("="*60)
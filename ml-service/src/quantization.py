@@ -0,0 +1,216 @@
+"""
+Embedding Quantization Module for Movie Recommendation System
+
+Compresses the SVD embeddings into int8 or product-quantized codes and
+serves neighbor queries by scanning the codes for candidates, then
+re-ranking those candidates with the exact (memory-mapped) vectors.
+"""
+
+import numpy as np
+import os
+
+
+QUANTIZER_FILE = 'quantizer.joblib'
+CODES_FILE = 'X_codes.npy'
+VECTORS_FILE = 'X_reduced.npy'
+QUANTIZED_FILES = [QUANTIZER_FILE, CODES_FILE, VECTORS_FILE]
+
+# Rows scored per chunk while scanning codes, bounds the float32 temporaries
+SCAN_CHUNK = 65536
+
+
+def normalize_rows(X):
+    """L2-normalize rows so a dot product equals cosine similarity."""
+    X = np.asarray(X, dtype=np.float32)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+
+class ScalarQuantizer:
+    """Per-dimension int8 quantizer (8x smaller than float64)."""
+
+    method = 'int8'
+
+    def __init__(self):
+        self.offset = None
+        self.scale = None
+
+    def fit(self, X):
+        lo = X.min(axis=0)
+        hi = X.max(axis=0)
+        self.offset = lo.astype(np.float32)
+        self.scale = np.where(hi > lo, (hi - lo) / 255.0, 1.0).astype(np.float32)
+        return self
+
+    def encode(self, X):
+        codes = np.rint((X - self.offset) / self.scale) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def approximate_scores(self, codes, q):
+        """Approximate q . x for every encoded row without decoding them."""
+        w = (q * self.scale).astype(np.float32)
+        bias = np.float32(128 * w.sum() + q @ self.offset)
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCAN_CHUNK):
+            block = codes[start:start + SCAN_CHUNK]
+            scores[start:start + len(block)] = block.astype(np.float32) @ w + bias
+        return scores
+
+
+class ProductQuantizer:
+    """Product quantizer: one uint8 centroid id per sub-vector."""
+
+    method = 'pq'
+
+    def __init__(self, n_subvectors=10, n_centroids=256, random_state=42):
+        if n_centroids > 256:
+            raise ValueError("n_centroids must fit in a uint8 code (<= 256)")
+        self.n_subvectors = n_subvectors
+        self.n_centroids = n_centroids
+        self.random_state = random_state
+        self.splits = None
+        self.codebooks = []
+
+    def fit(self, X):
+        # Training-only dependency, serving never needs it
+        from sklearn.cluster import KMeans
+
+        self.splits = np.array_split(np.arange(X.shape[1]), self.n_subvectors)
+        self.codebooks = []
+        for dims in self.splits:
+            kmeans = KMeans(
+                n_clusters=min(self.n_centroids, len(X)),
+                n_init=1,
+                random_state=self.random_state
+            )
+            kmeans.fit(X[:, dims])
+            self.codebooks.append(kmeans.cluster_centers_.astype(np.float32))
+        return self
+
+    def encode(self, X):
+        codes = np.empty((len(X), len(self.splits)), dtype=np.uint8)
+        for j, (dims, centroids) in enumerate(zip(self.splits, self.codebooks)):
+            c_norms = (centroids ** 2).sum(axis=1)
+            for start in range(0, len(X), SCAN_CHUNK):
+                sub = X[start:start + SCAN_CHUNK, dims]
+                # argmin ||x - c||^2 == argmin (||c||^2 - 2 x.c)
+                codes[start:start + len(sub), j] = np.argmin(c_norms - 2 * sub @ centroids.T, axis=1)
+        return codes
+
+    def approximate_scores(self, codes, q):
+        """Asymmetric distance computation: one lookup table per sub-vector."""
+        tables = [centroids @ q[dims] for dims, centroids in zip(self.splits, self.codebooks)]
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for j, table in enumerate(tables):
+            scores += table[codes[:, j]]
+        return scores
+
+
+QUANTIZERS = {
+    'int8': ScalarQuantizer,
+    'pq': ProductQuantizer,
+}
+
+
+class QuantizedIndex:
+    """
+    Cosine neighbor index over quantized embeddings.
+
+    Exposes the same kneighbors() signature as the fitted NearestNeighbors
+    model so it can be swapped in wherever the KNN model is used.
+    """
+
+    def __init__(self, quantizer, codes, vectors, rerank=200):
+        self.quantizer = quantizer
+        self.codes = codes
+        self.vectors = vectors
+        self.rerank = rerank
+
+    @classmethod
+    def build(cls, X, method='int8', rerank=200, **kwargs):
+        """Fit a quantizer on the normalized embeddings and encode them."""
+        if method not in QUANTIZERS:
+            raise ValueError(f"Unknown quantization '{method}', expected one of {list(QUANTIZERS)}")
+
+        X_norm = normalize_rows(X)
+        quantizer = QUANTIZERS[method](**kwargs).fit(X_norm)
+        return cls(quantizer, quantizer.encode(X_norm), X, rerank=rerank)
+
+    def kneighbors(self, X, n_neighbors=6, return_distance=True):
+        """Return cosine distances and indices of the nearest rows."""
+        queries = normalize_rows(np.atleast_2d(X))
+        n_neighbors = min(n_neighbors, len(self.codes))
+        n_candidates = min(max(self.rerank, n_neighbors), len(self.codes))
+
+        all_distances = np.empty((len(queries), n_neighbors), dtype=np.float64)
+        all_indices = np.empty((len(queries), n_neighbors), dtype=np.intp)
+
+        for qi, q in enumerate(queries):
+            # Cheap pass over the compressed codes
+            approx = self.quantizer.approximate_scores(self.codes, q)
+            if n_candidates < len(approx):
+                candidates = np.argpartition(-approx, n_candidates - 1)[:n_candidates]
+            else:
+                candidates = np.arange(len(approx))
+
+            # Exact re-rank, only touches n_candidates rows of the mmap
+            candidates.sort()
+            exact = normalize_rows(self.vectors[candidates]) @ q
+            order = np.argsort(-exact)[:n_neighbors]
+            all_indices[qi] = candidates[order]
+            all_distances[qi] = 1.0 - exact[order]
+
+        if return_distance:
+            return all_distances, all_indices
+        return all_indices
+
+    def memory_report(self):
+        """Bytes held by the compressed codes vs. float64 embeddings."""
+        n, dim = self.vectors.shape
+        return {
+            'method': self.quantizer.method,
+            'float64_bytes': n * dim * 8,
+            'code_bytes': int(self.codes.nbytes),
+            'bytes_per_movie': self.codes.nbytes / max(n, 1),
+        }
+
+    def save(self, models_dir):
+        """Write quantizer, codes and exact vectors (as .npy for mmap)."""
+        import joblib
+        joblib.dump({'quantizer': self.quantizer, 'rerank': self.rerank},
+                    os.path.join(models_dir, QUANTIZER_FILE))
+        np.save(os.path.join(models_dir, CODES_FILE), self.codes)
+        np.save(os.path.join(models_dir, VECTORS_FILE), np.asarray(self.vectors))
+        return QUANTIZED_FILES
+
+    @classmethod
+    def load(cls, models_dir):
+        """Load a saved index; exact vectors are memory-mapped, not read."""
+        import joblib
+        state = joblib.load(os.path.join(models_dir, QUANTIZER_FILE))
+        codes = np.load(os.path.join(models_dir, CODES_FILE))
+        vectors = np.load(os.path.join(models_dir, VECTORS_FILE), mmap_mode='r')
+        return cls(state['quantizer'], codes, vectors, rerank=state['rerank'])
+
+
+def is_quantized(models_dir):
+    """True if the models directory was saved with a quantized index."""
+    return os.path.exists(os.path.join(models_dir, QUANTIZER_FILE))
+
+
+def load_neighbor_index(models_dir):
+    """
+    Load (X_reduced, neighbor index) from a models directory.
+
+    Quantized directories return the memory-mapped vectors and a
+    QuantizedIndex; otherwise the joblib embeddings and KNN model.
+    """
+    if is_quantized(models_dir):
+        index = QuantizedIndex.load(models_dir)
+        return index.vectors, index
+
+    import joblib
+    X_reduced = joblib.load(os.path.join(models_dir, 'X_reduced.joblib'))
+    knn = joblib.load(os.path.join(models_dir, 'knn.joblib'))
+    return X_reduced, knn
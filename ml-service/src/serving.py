@@ -0,0 +1,490 @@
+"""
+Serving Runtime Module for Movie Recommendation System
+
+Loads the model for the Flask API. The lean path reads only the NumPy
+artifacts exported by the training pipeline (models/serving/), so a
+worker starts without importing pandas or scikit-learn; the full path
+loads the joblib artifacts used during training.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from dedup import CLUSTERS_FILE
+from neighbors_job import NEIGHBORS_DIST_FILE, NEIGHBORS_IDX_FILE, all_pairs_neighbors
+from quantization import is_quantized
+from snapshot import SNAPSHOT_FILE, export_snapshot
+from title_index import KEYS_FILE, OFFSETS_FILE, ROWS_FILE, TitleIndex
+
+
+SERVING_DIR = 'serving'
+MANIFEST_FILE = 'manifest.json'
+SIMILARITY_FILE = 'item_similarity.npz'
+META_COLUMNS = ['title', 'id', 'poster_path', 'vote_average', 'release_date']
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB, or None if unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is KB on Linux, bytes on macOS; this is the peak, not current
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+    except ImportError:
+        return None
+
+
+def heavy_modules_loaded():
+    """Which of the slow-to-import training libraries are in this process."""
+    return [name for name in ('pandas', 'sklearn', 'scipy') if name in sys.modules]
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _normalize(X):
+    X = np.asarray(X, dtype=np.float32)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+
+def build_id_index(ids):
+    """
+    Dense TMDB id -> row array (-1 where no movie has that id), so id
+    lookups are a single array index.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    index = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=np.int32)
+    index[ids] = np.arange(len(ids), dtype=np.int32)
+    return index
+
+
+def meta_to_columns(meta):
+    """Convert the metadata DataFrame into plain NumPy column arrays."""
+    columns = {}
+    for col in META_COLUMNS:
+        if col not in meta.columns:
+            continue
+        values = meta[col]
+        if col == 'id':
+            columns[col] = values.to_numpy(dtype=np.int64)
+        elif col == 'vote_average':
+            columns[col] = values.to_numpy(dtype=np.float64)
+        else:
+            # Fixed-width unicode arrays load without pickle and can be mmapped
+            columns[col] = values.fillna('').astype(str).to_numpy(dtype=str)
+    return columns
+
+
+class ArtifactCache:
+    """
+    Loaded artifacts keyed by the content hash from the export manifest,
+    so model variants exported from the same data share one copy of each
+    identical file (metadata, title index) instead of loading their own.
+    """
+
+    def __init__(self):
+        self._items = {}
+
+    def get(self, key, loader):
+        """Return the artifact for key, calling loader() only on a miss."""
+        if key is None:
+            return loader()
+        if key not in self._items:
+            self._items[key] = loader()
+        return self._items[key]
+
+
+class ItemSimilarity:
+    """
+    Read-only CSR item-item similarity matrix, loaded with NumPy alone so
+    the lean runtime does not need SciPy.
+    """
+
+    def __init__(self, data, indices, indptr):
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+
+    @classmethod
+    def load(cls, directory):
+        """Load the .npz written by scipy.sparse.save_npz, or None if absent."""
+        path = os.path.join(directory, SIMILARITY_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as npz:
+            fmt = npz['format'].item()
+            if (fmt.decode() if isinstance(fmt, bytes) else fmt) != 'csr':
+                raise ValueError(f"{path} is not a CSR matrix")
+            return cls(npz['data'], npz['indices'], npz['indptr'])
+
+    def save(self, directory):
+        """Write in the scipy.sparse.save_npz layout."""
+        n = len(self.indptr) - 1
+        np.savez(os.path.join(directory, SIMILARITY_FILE), data=self.data,
+                 indices=self.indices, indptr=self.indptr,
+                 format=np.array(b'csr'), shape=np.array([n, n]))
+        return [SIMILARITY_FILE]
+
+    def row(self, i):
+        """(neighbor rows, similarities) of movie i."""
+        start, stop = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:stop], self.data[start:stop]
+
+
+def export_serving_model(out_dir, X_reduced, meta, titles, title_index,
+                         svd=None, vectorizer_path=None, item_similarity=None,
+                         duplicate_clusters=None, n_neighbors=20, snapshot_neighbors=10, n_jobs=None, memory_limit_mb=None):
+    """
+    Write the NumPy-only artifacts used by ServingModel.from_export.
+
+    Besides embeddings and metadata columns this precomputes each movie's
+    top `n_neighbors` (with the all-pairs job, exact cosine) so the common
+    /api/recommend path is a table lookup, and the first
+    `snapshot_neighbors` of them go into the snapshot file the Node
+    backend serves from directly.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    arrays = {'embeddings': _normalize(X_reduced)}
+
+    n = len(X_reduced)
+    k = min(n_neighbors + 1, n)
+    neighbor_idx, neighbor_dist = all_pairs_neighbors(arrays['embeddings'], k, out_dir, n_jobs=n_jobs,
+                                                      memory_limit_mb=memory_limit_mb)
+
+    for col, values in meta_to_columns(meta).items():
+        arrays[f'meta_{col}'] = values
+    if 'meta_id' in arrays:
+        arrays['id_index'] = build_id_index(arrays['meta_id'])
+    if 'title' not in meta.columns:
+        arrays['meta_title'] = np.asarray(titles, dtype=str)
+
+    if svd is not None:
+        arrays['svd_components'] = svd.components_.astype(np.float32)
+    if duplicate_clusters is not None:
+        arrays['duplicate_clusters'] = np.asarray(duplicate_clusters, dtype=np.int32)
+
+    files = [f'{name}.npy' for name in arrays] + [NEIGHBORS_IDX_FILE, NEIGHBORS_DIST_FILE]
+    for name, values in arrays.items():
+        np.save(os.path.join(out_dir, f'{name}.npy'), values)
+    files += title_index.save(out_dir)
+    if item_similarity is not None:
+        sim = ItemSimilarity(item_similarity.data, item_similarity.indices, item_similarity.indptr)
+        files += sim.save(out_dir)
+    if 'meta_id' in arrays:
+        columns = {name[len('meta_'):]: v for name, v in arrays.items() if name.startswith('meta_')}
+        files.append(export_snapshot(os.path.join(out_dir, SNAPSHOT_FILE), columns, title_index,
+                                     neighbor_idx, neighbor_dist, n_neighbors=snapshot_neighbors,
+                                     clusters=arrays.get('duplicate_clusters')))
+
+    # Drop what an earlier export wrote but this one did not (e.g. the
+    # duplicate clusters after a --no-dedup retrain)
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f).get('files', {})
+        for stale in set(previous) - set(files):
+            stale_path = os.path.join(out_dir, stale)
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+
+    manifest = {
+        'n_movies': n,
+        'n_neighbors': k - 1,
+        'vectorizer': os.path.relpath(vectorizer_path, out_dir) if vectorizer_path else None,
+        'files': {f: _file_sha256(os.path.join(out_dir, f)) for f in files},
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return files
+
+
+class ServingModel:
+    """Read-only model used by the API to answer lookups."""
+
+    def __init__(self, columns, title_index, embeddings, neighbor_idx=None,
+                 neighbor_dist=None, index=None, svd_components=None,
+                 vectorizer_path=None, item_similarity=None, id_index=None,
+                 duplicate_clusters=None, mode='lean'):
+        self.columns = columns
+        self.title_index = title_index
+        self.embeddings = embeddings
+        self.neighbor_idx = neighbor_idx
+        self.neighbor_dist = neighbor_dist
+        self.index = index
+        self.svd_components = svd_components
+        self.vectorizer_path = vectorizer_path
+        self.item_similarity = item_similarity
+        if id_index is None and 'id' in columns:
+            id_index = build_id_index(columns['id'])
+        self.id_index = id_index
+        self.duplicate_clusters = duplicate_clusters
+        self.mode = mode
+        self._titles = None
+        self._vectorizer = None
+
+    @classmethod
+    def from_export(cls, serving_dir, cache=None):
+        """
+        Load the NumPy-only export; nothing here imports pandas or sklearn.
+        Files already in `cache` (same content hash) are reused.
+        """
+        with open(os.path.join(serving_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        digests = manifest.get('files', {})
+        cache = cache or ArtifactCache()
+
+        # Only files the manifest lists belong to this export; anything else
+        # in the directory is left over from an earlier run
+        def load(name):
+            filename = f'{name}.npy'
+            if filename not in digests:
+                return None
+            path = os.path.join(serving_dir, filename)
+            return cache.get(digests[filename], lambda: np.load(path, mmap_mode='r'))
+
+        def shared(files, loader):
+            if not all(f in digests for f in files):
+                return None
+            return cache.get(tuple(digests[f] for f in files), loader)
+
+        columns = {}
+        for col in META_COLUMNS:
+            values = load(f'meta_{col}')
+            if values is not None:
+                columns[col] = values
+
+        vectorizer = manifest.get('vectorizer')
+        return cls(
+            columns=columns,
+            title_index=shared([KEYS_FILE, OFFSETS_FILE, ROWS_FILE],
+                               lambda: TitleIndex.load(serving_dir)),
+            embeddings=load('embeddings'),
+            neighbor_idx=load('neighbors_idx'),
+            neighbor_dist=load('neighbors_dist'),
+            svd_components=load('svd_components'),
+            vectorizer_path=os.path.join(serving_dir, vectorizer) if vectorizer else None,
+            item_similarity=shared([SIMILARITY_FILE], lambda: ItemSimilarity.load(serving_dir)),
+            id_index=load('id_index'),
+            duplicate_clusters=load('duplicate_clusters'),
+            mode='lean',
+        )
+
+    @classmethod
+    def from_models_dir(cls, models_dir):
+        """Load the joblib training artifacts (imports pandas and sklearn)."""
+        import joblib
+        from quantization import load_neighbor_index
+
+        X_reduced, index = load_neighbor_index(models_dir)
+        meta = joblib.load(os.path.join(models_dir, 'meta.joblib'))
+        titles = joblib.load(os.path.join(models_dir, 'titles.joblib'))
+
+        columns = meta_to_columns(meta)
+        columns['title'] = np.asarray(titles, dtype=str)
+
+        svd_path = os.path.join(models_dir, 'svd.joblib')
+        svd_components = joblib.load(svd_path).components_ if os.path.exists(svd_path) else None
+        clusters_path = os.path.join(models_dir, CLUSTERS_FILE)
+        clusters = np.load(clusters_path, mmap_mode='r') if os.path.exists(clusters_path) else None
+
+        return cls(
+            columns=columns,
+            title_index=TitleIndex.load_or_build(models_dir, titles),
+            # Left as loaded (a memmap when quantized); rows are normalized as read
+            embeddings=X_reduced,
+            index=index,
+            svd_components=svd_components,
+            vectorizer_path=os.path.join(models_dir, 'vectorizer.joblib'),
+            item_similarity=ItemSimilarity.load(models_dir),
+            duplicate_clusters=clusters,
+            mode='full',
+        )
+
+    @classmethod
+    def load(cls, models_dir, mode='auto', cache=None):
+        """
+        Load in 'lean' mode (serving export), 'full' mode (joblib), or
+        'auto' which prefers the export when the training run produced one,
+        unless the model was quantized (the export holds float32 embeddings).
+        """
+        serving_dir = os.path.join(models_dir, SERVING_DIR)
+        has_export = os.path.exists(os.path.join(serving_dir, MANIFEST_FILE))
+        if mode == 'lean' or (mode == 'auto' and has_export and not is_quantized(models_dir)):
+            return cls.from_export(serving_dir, cache=cache)
+        return cls.from_models_dir(models_dir)
+
+    def __len__(self):
+        return len(self.columns['title'])
+
+    @property
+    def titles(self):
+        """Titles as a Python list, built on first use (fuzzy matching only)."""
+        if self._titles is None:
+            self._titles = self.columns['title'].tolist()
+        return self._titles
+
+    def title(self, row):
+        return str(self.columns['title'][row])
+
+    def find(self, title):
+        """Exact (normalized) title lookup, returns a row or None."""
+        return self.title_index.get(title)
+
+    def find_by_id(self, tmdb_id):
+        """TMDB id lookup, returns a row or None."""
+        if self.id_index is None or not 0 <= tmdb_id < len(self.id_index):
+            return None
+        row = int(self.id_index[tmdb_id])
+        return row if row >= 0 else None
+
+    def fuzzy_titles(self, query, n=5, cutoff=0.4):
+        """Closest titles by difflib ratio, used when exact lookup misses."""
+        return difflib.get_close_matches(query, self.titles, n=n, cutoff=cutoff)
+
+    def prefix(self, query, limit=10):
+        return self.title_index.prefix(query, limit=limit)
+
+    def collapse(self, pairs, n, row=None):
+        """
+        First n of [(row, distance)] keeping one movie per near-duplicate
+        cluster and dropping `row` and its own duplicates.
+        """
+        clusters = self.duplicate_clusters
+        seen = set() if row is None or clusters is None else {int(clusters[row])}
+        result = []
+        for i, d in pairs:
+            if i == row:
+                continue
+            if clusters is not None:
+                cluster = int(clusters[i])
+                if cluster in seen:
+                    continue
+                seen.add(cluster)
+            result.append((i, d))
+            if len(result) == n:
+                break
+        return result
+
+    def neighbors(self, row, n=5):
+        """Return [(row, cosine distance)] for the n nearest other movies."""
+        if self.neighbor_idx is not None and n < self.neighbor_idx.shape[1]:
+            pairs = zip(self.neighbor_idx[row].tolist(), self.neighbor_dist[row].tolist())
+        elif self.index is not None:
+            dist, idx = self.index.kneighbors([np.asarray(self.embeddings[row])], n_neighbors=2 * n + 1)
+            pairs = zip(idx[0].tolist(), dist[0].tolist())
+        else:
+            pairs = self.nearest_to_vector(self.embeddings[row], n + 1)
+        return self.collapse(pairs, n, row)
+
+    def blended_neighbors(self, row, n=5, weight=0.5, n_candidates=20):
+        """
+        Blend content and collaborative similarity for one movie.
+
+        Candidates are the union of the top content neighbors and the
+        movie's stored item-item neighbors; each is scored as
+        (1 - weight) * content cosine + weight * item-item similarity and
+        returned as [(row, 1 - score)].
+        """
+        if self.item_similarity is None or weight <= 0:
+            return self.neighbors(row, n=n)
+
+        content = dict((i, 1.0 - d) for i, d in self.neighbors(row, n=n_candidates))
+        cf_rows, cf_sims = self.item_similarity.row(row)
+        collaborative = dict(zip(cf_rows.tolist(), cf_sims.tolist()))
+
+        # Content similarity for collaborative-only candidates, one small matmul
+        missing = [i for i in collaborative if i not in content and i != row]
+        if missing:
+            sims = _normalize(self.embeddings[missing]) @ _normalize(self.embeddings[[row]])[0]
+            content.update(zip(missing, sims.tolist()))
+
+        scored = [
+            (i, (1 - weight) * sim + weight * collaborative.get(i, 0.0))
+            for i, sim in content.items() if i != row
+        ]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return self.collapse(((i, 1.0 - score) for i, score in scored), n, row)
+
+    def nearest_to_vector(self, vector, n=5):
+        """
+        Cosine search through the neighbor index when one is loaded (full
+        mode), else brute force over the normalized embeddings (lean mode).
+        """
+        q = _normalize(np.atleast_2d(vector))[0]
+        # Extra candidates so collapsing duplicates still leaves n results
+        m = min(2 * n if self.duplicate_clusters is not None else n, len(self))
+        if self.index is not None:
+            dist, idx = self.index.kneighbors([q], n_neighbors=m)
+            return self.collapse(zip(idx[0].tolist(), dist[0].tolist()), n)
+
+        sims = np.asarray(self.embeddings @ q)
+        top = np.argpartition(-sims, m - 1)[:m]
+        top = top[np.argsort(-sims[top])]
+        return self.collapse(((int(i), float(1.0 - sims[i])) for i in top), n)
+
+    def embed_text(self, text):
+        """
+        Project free text into the embedding space.
+
+        The vectorizer is the only piece that needs scikit-learn, so it is
+        unpickled on the first free-text query rather than at startup.
+        """
+        if self.svd_components is None or not self.vectorizer_path:
+            raise RuntimeError("Free-text queries need the vectorizer and SVD components")
+        if self._vectorizer is None:
+            import joblib
+            self._vectorizer = joblib.load(self.vectorizer_path)
+        tfidf = self._vectorizer.transform([text])
+        return np.asarray(tfidf @ np.asarray(self.svd_components).T)[0]
+
+    def movie(self, row):
+        """Metadata for one row as plain Python values."""
+        cols = self.columns
+        poster = str(cols['poster_path'][row]) if 'poster_path' in cols else ''
+        vote = float(cols['vote_average'][row]) if 'vote_average' in cols else None
+        return {
+            'title': self.title(row),
+            'tmdb_id': int(cols['id'][row]) if 'id' in cols else None,
+            'poster_path': poster or None,
+            'vote_average': None if vote is None or np.isnan(vote) else vote,
+        }
+
+    def arrays(self):
+        """(name, array) for every array the model holds, for memory accounting."""
+        named = {f'meta_{col}': values for col, values in self.columns.items()}
+        named.update(
+            embeddings=self.embeddings,
+            neighbors_idx=self.neighbor_idx,
+            neighbors_dist=self.neighbor_dist,
+            svd_components=self.svd_components,
+            id_index=self.id_index,
+            duplicate_clusters=self.duplicate_clusters,
+            title_index_keys=self.title_index.keys,
+            title_index_offsets=self.title_index.offsets,
+            title_index_rows=self.title_index.rows,
+        )
+        if self.item_similarity is not None:
+            named.update(
+                similarity_data=self.item_similarity.data,
+                similarity_indices=self.item_similarity.indices,
+                similarity_indptr=self.item_similarity.indptr,
+            )
+        return [(name, values) for name, values in named.items() if isinstance(values, np.ndarray)]
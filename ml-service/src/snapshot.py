@@ -0,0 +1,123 @@
+"""
+Recommendation Snapshot Module for Movie Recommendation System
+
+Writes a single read-only binary file with every movie's top-K content
+neighbors, its display metadata and lookup tables keyed by normalized
+title and TMDB id. The Node backend loads it once and answers plain
+recommendation requests without a round trip to this service.
+
+Layout (little-endian): the 8-byte magic, a uint32 header length and a
+JSON header describing each section as {offset, dtype, length}, followed
+by the sections themselves, each aligned to 8 bytes so they can be
+viewed as typed arrays in place.
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+
+SNAPSHOT_FILE = 'snapshot.bin'
+MAGIC = b'MOVSNAP1'
+VERSION = 1
+
+_ALIGN = 8
+
+
+def _string_table(values):
+    """Encode strings as one UTF-8 buffer plus uint32 offsets."""
+    encoded = [str(v).encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _top_neighbors(neighbor_idx, neighbor_dist, k, clusters=None):
+    """
+    Drop each row's self match (and, given duplicate cluster ids, its own
+    duplicates and repeats of a cluster) and keep the first k neighbors.
+    Rows left with fewer than k are padded with -1.
+    """
+    n = len(neighbor_idx)
+    keep = np.asarray(neighbor_idx) != np.arange(n)[:, None]
+    if clusters is not None:
+        C = np.asarray(clusters)[np.asarray(neighbor_idx)]
+        keep &= C != np.asarray(clusters)[:, None]
+        for j in range(1, C.shape[1]):
+            keep[:, j] &= ~(C[:, :j] == C[:, j:j + 1]).any(axis=1)
+    # Stable sort moves dropped columns last without reordering the rest
+    order = np.argsort(~keep, axis=1, kind='stable')[:, :k]
+    idx = np.take_along_axis(np.asarray(neighbor_idx), order, axis=1).astype(np.int32)
+    dist = np.take_along_axis(np.asarray(neighbor_dist), order, axis=1).astype(np.float32)
+    dropped = ~np.take_along_axis(keep, order, axis=1)
+    idx[dropped] = -1
+    dist[dropped] = np.nan
+    return idx, dist
+
+
+def export_snapshot(path, columns, title_index, neighbor_idx, neighbor_dist, n_neighbors=10,
+                    clusters=None):
+    """
+    Write the snapshot from serving columns (title, id, poster_path,
+    vote_average), the TitleIndex, the precomputed neighbor table and
+    optional near-duplicate cluster ids.
+    """
+    k = min(n_neighbors, neighbor_idx.shape[1] - 1)
+    idx, dist = _top_neighbors(neighbor_idx, neighbor_dist, k, clusters)
+
+    n = len(columns['title'])
+    ids = np.asarray(columns['id'], dtype=np.int32)
+    id_order = np.argsort(ids, kind='stable').astype(np.int32)
+    posters = columns['poster_path'] if 'poster_path' in columns else [''] * n
+    votes = columns['vote_average'] if 'vote_average' in columns else np.full(n, np.nan)
+
+    title_bytes, title_offsets = _string_table(columns['title'])
+    poster_bytes, poster_offsets = _string_table(posters)
+
+    sections = {
+        'ids': ids,
+        'vote_average': np.asarray(votes, dtype=np.float64),
+        'neighbors': idx.ravel(),
+        'distances': dist.ravel(),
+        'title_offsets': title_offsets,
+        'title_bytes': title_bytes,
+        'poster_offsets': poster_offsets,
+        'poster_bytes': poster_bytes,
+        'key_offsets': np.asarray(title_index.offsets, dtype=np.uint32),
+        'key_bytes': np.asarray(title_index.keys, dtype=np.uint8),
+        'key_rows': np.asarray(title_index.rows, dtype=np.int32),
+        'id_sorted': ids[id_order],
+        'id_rows': id_order,
+    }
+
+    # Offsets depend on the header size, so lay out until the header stops growing
+    header_size = 0
+    while True:
+        offset = -(-(len(MAGIC) + 4 + header_size) // _ALIGN) * _ALIGN
+        table = {}
+        for name, values in sections.items():
+            table[name] = {'offset': offset, 'dtype': values.dtype.str.lstrip('<|'),
+                           'length': int(values.size)}
+            offset += -(-values.nbytes // _ALIGN) * _ALIGN
+        header = json.dumps({
+            'version': VERSION,
+            'n_movies': n,
+            'n_neighbors': k,
+            'sections': table,
+        }).encode('utf-8')
+        if len(header) <= header_size:
+            break
+        header_size = len(header)
+    header = header.ljust(header_size)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', header_size) + header)
+        for name, values in sections.items():
+            f.write(b'\0' * (table[name]['offset'] - f.tell()))
+            f.write(np.ascontiguousarray(values).astype(values.dtype.newbyteorder('<')).tobytes())
+    # Readers never see a half-written file
+    os.replace(tmp_path, path)
+    return os.path.basename(path)
@@ -0,0 +1,120 @@
+"""
+Title Index Module for Movie Recommendation System
+
+A compact, immutable lookup table from normalized movie titles to row
+indices. Keys are stored sorted in one contiguous UTF-8 buffer with an
+offsets array, so the whole table is three NumPy arrays that can be
+memory-mapped and binary-searched without building any Python objects.
+"""
+
+import numpy as np
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+
+
+KEYS_FILE = 'title_index_keys.npy'
+OFFSETS_FILE = 'title_index_offsets.npy'
+ROWS_FILE = 'title_index_rows.npy'
+
+_NON_ALNUM = re.compile(r'[\W_]+')
+
+
+def normalize_title(title):
+    """
+    Normalize a title for matching: strip accents, casefold, and collapse
+    punctuation/whitespace, so "Amélie" == "amelie" and
+    "Spider-Man 2" == "spider man 2".
+    """
+    decomposed = unicodedata.normalize('NFKD', str(title))
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(' ', stripped.casefold()).strip()
+
+
+class _SortedKeys:
+    """Sequence view over the key buffer so bisect can search it in place."""
+
+    def __init__(self, keys, offsets):
+        self.keys = keys
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.keys[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+
+class TitleIndex:
+    """Case/accent/punctuation-insensitive exact and prefix title lookup."""
+
+    def __init__(self, keys, offsets, rows):
+        self.keys = keys
+        self.offsets = offsets
+        self.rows = rows
+        self._sorted = _SortedKeys(keys, offsets)
+
+    @classmethod
+    def build(cls, titles):
+        """Build the table from titles in row order."""
+        encoded = [normalize_title(t).encode('utf-8') for t in titles]
+        # Stable sort keeps duplicate keys in row order
+        order = sorted(range(len(encoded)), key=encoded.__getitem__)
+
+        lengths = np.fromiter((len(encoded[i]) for i in order), dtype=np.int64, count=len(order))
+        offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        keys = np.frombuffer(b''.join(encoded[i] for i in order), dtype=np.uint8)
+        rows = np.asarray(order, dtype=np.int32)
+        return cls(keys, offsets, rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _key(self, title):
+        return normalize_title(title).encode('utf-8')
+
+    def get(self, title, default=None):
+        """Return the first row matching the normalized title."""
+        key = self._key(title)
+        pos = bisect_left(self._sorted, key)
+        if pos < len(self) and self._sorted[pos] == key:
+            return int(self.rows[pos])
+        return default
+
+    def prefix(self, text, limit=10):
+        """Return up to `limit` rows whose normalized title starts with text."""
+        key = self._key(text)
+        if not key:
+            return []
+        pos = bisect_left(self._sorted, key)
+        matches = []
+        while pos < len(self) and len(matches) < limit and self._sorted[pos].startswith(key):
+            matches.append(int(self.rows[pos]))
+            pos += 1
+        return matches
+
+    def save(self, models_dir):
+        """Write the three arrays as .npy files."""
+        np.save(os.path.join(models_dir, KEYS_FILE), self.keys)
+        np.save(os.path.join(models_dir, OFFSETS_FILE), self.offsets)
+        np.save(os.path.join(models_dir, ROWS_FILE), self.rows)
+        return [KEYS_FILE, OFFSETS_FILE, ROWS_FILE]
+
+    @classmethod
+    def load(cls, models_dir, mmap=True):
+        """Load a saved table, memory-mapped by default."""
+        mode = 'r' if mmap else None
+        return cls(
+            np.load(os.path.join(models_dir, KEYS_FILE), mmap_mode=mode),
+            np.load(os.path.join(models_dir, OFFSETS_FILE), mmap_mode=mode),
+            np.load(os.path.join(models_dir, ROWS_FILE), mmap_mode=mode),
+        )
+
+    @classmethod
+    def load_or_build(cls, models_dir, titles):
+        """Load the saved table, or build one for model dirs that predate it."""
+        if os.path.exists(os.path.join(models_dir, KEYS_FILE)):
+            return cls.load(models_dir)
+        return cls.build(titles)
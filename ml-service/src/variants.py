@@ -0,0 +1,139 @@
+"""
+Model Variants Module for Movie Recommendation System
+
+Loads several trained models side by side for A/B tests. The model in
+models/ is the "default" variant; every subdirectory of models/ holding
+a trained model (e.g. written with `model_builder.py --variant svd200`)
+is another one. Requests pick a variant explicitly or are assigned by a
+stable hash of the user id, weighted by models/variants.json:
+
+    {"default": "default", "salt": "exp-1",
+     "variants": {"default": {"weight": 90}, "svd200": {"weight": 10}}}
+
+Without weights all traffic goes to the default variant. Variants share
+identical artifacts through one ArtifactCache.
+"""
+
+import hashlib
+import json
+import os
+
+from serving import MANIFEST_FILE, SERVING_DIR, ArtifactCache, ServingModel
+
+
+VARIANTS_FILE = 'variants.json'
+DEFAULT_VARIANT = 'default'
+
+
+def _is_model_dir(path):
+    return (os.path.exists(os.path.join(path, SERVING_DIR, MANIFEST_FILE))
+            or os.path.exists(os.path.join(path, 'vectorizer.joblib')))
+
+
+def discover_variants(models_dir):
+    """Map variant name -> model directory for models_dir and its subdirectories."""
+    found = {}
+    if _is_model_dir(models_dir):
+        found[DEFAULT_VARIANT] = models_dir
+    for name in sorted(os.listdir(models_dir)) if os.path.isdir(models_dir) else []:
+        path = os.path.join(models_dir, name)
+        if name != SERVING_DIR and os.path.isdir(path) and _is_model_dir(path):
+            found[name] = path
+    return found
+
+
+def user_bucket(user_id, salt=''):
+    """Stable position in [0, 1) for a user id."""
+    digest = hashlib.sha256(f'{salt}:{user_id}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+class VariantRegistry:
+    """Named ServingModels plus the rules for routing requests between them."""
+
+    def __init__(self, models, weights=None, default=DEFAULT_VARIANT, salt='', cache=None):
+        if default not in models:
+            raise ValueError(f"Default variant '{default}' is not loaded")
+        self.models = models
+        self.default = default
+        self.salt = salt
+        self.cache = cache
+        weights = {name: w for name, w in (weights or {}).items() if name in models and w > 0}
+        self.weights = weights or {default: 1}
+
+    @classmethod
+    def load(cls, models_dir, mode='auto'):
+        """Load every variant under models_dir, sharing identical artifacts."""
+        config = {}
+        config_path = os.path.join(models_dir, VARIANTS_FILE)
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                config = json.load(f)
+
+        paths = discover_variants(models_dir)
+        settings = config.get('variants', {})
+        for name, entry in settings.items():
+            if 'path' in entry:
+                paths[name] = os.path.join(models_dir, entry['path'])
+
+        cache = ArtifactCache()
+        models = {name: ServingModel.load(path, mode=mode, cache=cache) for name, path in paths.items()}
+        return cls(
+            models,
+            weights={name: entry.get('weight', 0) for name, entry in settings.items()},
+            default=config.get('default', DEFAULT_VARIANT),
+            salt=config.get('salt', ''),
+            cache=cache,
+        )
+
+    def __getitem__(self, name):
+        return self.models[name]
+
+    @property
+    def names(self):
+        return list(self.models)
+
+    @property
+    def weighted(self):
+        """True when user ids can be routed to a variant other than the default."""
+        return set(self.weights) != {self.default}
+
+    def choose(self, variant=None, user_id=None):
+        """
+        Variant name for a request: the explicit one if given (KeyError if
+        unknown), else a weighted pick by user bucket, else the default.
+        """
+        if variant:
+            if variant not in self.models:
+                raise KeyError(variant)
+            return variant
+        if not user_id:
+            return self.default
+
+        total = sum(self.weights.values())
+        point = user_bucket(user_id, self.salt) * total
+        for name, weight in self.weights.items():
+            point -= weight
+            if point < 0:
+                return name
+        return self.default
+
+    def memory_report(self):
+        """Bytes held per variant and how many of them are its own."""
+        owners = {}
+        for name, model in self.models.items():
+            for _, values in model.arrays():
+                owners.setdefault(id(values), (values.nbytes, set()))[1].add(name)
+
+        report = {}
+        for name, model in self.models.items():
+            arrays = {id(values): values.nbytes for _, values in model.arrays()}
+            own = sum(size for key, size in arrays.items() if len(owners[key][1]) == 1)
+            report[name] = {
+                'mode': model.mode,
+                'movies': len(model),
+                'weight': self.weights.get(name, 0),
+                'total_mb': round(sum(arrays.values()) / 1e6, 2),
+                'own_mb': round(own / 1e6, 2),
+            }
+        return report
@@ -10,6 +10,8 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import joblib
 import ast
+import os
+from matplotlib.patches import Patch
 from mpl_toolkits.mplot3d import Axes3D
 
 
@@ -24,6 +26,10 @@ class MovieVisualizer:
         self.X_pca_2d = joblib.load(f"{self.models_dir}/X_pca_2d.joblib")
         self.X_pca_3d = joblib.load(f"{self.models_dir}/X_pca_3d.joblib")
         self.meta = joblib.load(f"{self.models_dir}/meta.joblib")
+        
+        # Genre labels encoded at training time (older model dirs won't have them)
+        labels_path = f"{self.models_dir}/genre_labels.joblib"
+        self.genre_labels = joblib.load(labels_path) if os.path.exists(labels_path) else None
         print("✅ Data loaded")
         
     def extract_primary_genre(self, genres_str):
@@ -36,13 +42,27 @@ class MovieVisualizer:
             pass
         return 'Unknown'
     
+    def get_primary_genres(self):
+        """Return the primary genre of every movie as a NumPy array."""
+        if self.genre_labels is not None:
+            names = np.asarray(self.genre_labels['names'], dtype=object)
+            return names[self.genre_labels['codes']]
+        return self.meta['genres'].apply(self.extract_primary_genre).to_numpy()
+    
+    def get_genre_codes(self):
+        """Return (genre names, per-movie index into names), reusing the training-time codes."""
+        if self.genre_labels is not None:
+            names = np.asarray(self.genre_labels['names'], dtype=object)
+            return names, np.asarray(self.genre_labels['codes'], dtype=np.intp)
+        return np.unique(self.get_primary_genres(), return_inverse=True)
+    
     def create_2d_visualization(self, output_path='../docs/screenshots/pca_2d.png', 
                                 sample_size=None):
         """Create 2D PCA visualization with genre colors."""
         print("\n🎨 Creating 2D PCA visualization...")
         
         # Extract primary genres
-        self.meta['primary_genre'] = self.meta['genres'].apply(self.extract_primary_genre)
+        self.meta['primary_genre'] = self.get_primary_genres()
         
         # Sample if dataset is too large
         if sample_size and len(self.meta) > sample_size:
@@ -101,7 +121,7 @@ class MovieVisualizer:
         
         # Extract primary genres (if not already done)
         if 'primary_genre' not in self.meta.columns:
-            self.meta['primary_genre'] = self.meta['genres'].apply(self.extract_primary_genre)
+            self.meta['primary_genre'] = self.get_primary_genres()
         
         # Sample if dataset is too large
         if sample_size and len(self.meta) > sample_size:
@@ -154,6 +174,70 @@ class MovieVisualizer:
         print(f"✅ 3D visualization saved to: {output_path}")
         plt.close()
     
+    def create_density_visualization(self, output_path='../docs/screenshots/pca_2d_density.png',
+                                     width=1200, height=900, top_n_genres=10):
+        """
+        Render the full 2D PCA projection as a per-genre density image.
+        
+        Instead of drawing one marker per movie, every point is binned into a
+        (genre, y, x) histogram with a single np.bincount and the image is
+        composed directly from the counts, so the cost is linear in the number
+        of movies and no sampling is needed.
+        """
+        print("\n🎨 Creating 2D PCA density visualization...")
+        
+        coords = self.X_pca_2d
+        names, codes = self.get_genre_codes()
+        
+        # Keep the most common genres, fold the rest into 'Other'
+        top = np.argsort(np.bincount(codes))[::-1][:top_n_genres]
+        remap = np.full(len(names), len(top), dtype=np.intp)
+        remap[top] = np.arange(len(top))
+        categories = remap[codes]
+        labels = [names[i] for i in top]
+        if len(top) < len(names):
+            labels.append('Other')
+        n_cat = len(labels)
+        
+        # Bin all points at once into a flat (category, row, col) index
+        x, y = coords[:, 0], coords[:, 1]
+        x_min, x_max = x.min(), x.max()
+        y_min, y_max = y.min(), y.max()
+        col = ((x - x_min) / ((x_max - x_min) or 1.0) * (width - 1)).astype(np.intp)
+        row = ((y_max - y) / ((y_max - y_min) or 1.0) * (height - 1)).astype(np.intp)
+        flat = (categories * height + row) * width + col
+        counts = np.bincount(flat, minlength=n_cat * height * width)
+        counts = counts.reshape(n_cat, height, width).astype(np.float32)
+        
+        # Blend genre colours by their share of each pixel, shade by log density
+        colors = np.asarray(sns.color_palette('husl', len(top)), dtype=np.float32)
+        if n_cat > len(top):
+            colors = np.vstack([colors, [[0.6, 0.6, 0.6]]]).astype(np.float32)
+        total = counts.sum(axis=0)
+        occupied = total > 0
+        rgb = np.tensordot(counts, colors, axes=(0, 0))
+        rgb[occupied] /= total[occupied, None]
+        alpha = np.zeros_like(total)
+        alpha[occupied] = 0.25 + 0.75 * np.log1p(total[occupied]) / np.log1p(total.max())
+        image = 1.0 - alpha[..., None] * (1.0 - rgb)
+        
+        plt.figure(figsize=(14, 10))
+        plt.imshow(image, extent=(x_min, x_max, y_min, y_max), aspect='auto',
+                   interpolation='nearest')
+        plt.xlabel('First Principal Component', fontsize=12, fontweight='bold')
+        plt.ylabel('Second Principal Component', fontsize=12, fontweight='bold')
+        plt.title(f'Movie Clusters - 2D PCA Density ({len(coords):,} movies)\n'
+                  '(Colored by Primary Genre)',
+                  fontsize=14, fontweight='bold', pad=20)
+        handles = [Patch(color=c, label=l) for c, l in zip(colors, labels)]
+        plt.legend(handles=handles, bbox_to_anchor=(1.05, 1), loc='upper left',
+                   frameon=True, shadow=True, fontsize=10)
+        plt.tight_layout()
+        
+        plt.savefig(output_path, dpi=150, bbox_inches='tight')
+        print(f"✅ Density visualization saved to: {output_path}")
+        plt.close()
+    
     def create_all_visualizations(self, sample_size=2000):
         """Create all visualizations."""
         print("\n" + "="*60)
@@ -163,6 +247,9 @@ class MovieVisualizer:
         self.create_2d_visualization(sample_size=sample_size)
         self.create_3d_visualization(sample_size=sample_size)
         
+        # Density rendering is linear in the catalog size, so it never samples
+        self.create_density_visualization()
+        
         print("\n" + "="*60)
         print("🎉 Visualizations Complete!")
         print("="*60)